@@ -0,0 +1,121 @@
+import re
+
+class Aggregation:
+    """
+    Hash aggregation of rows : one entry per value of the grouped column, holding the state of each aggregate
+    Aggregations of separate files are merged, so that files can be aggregated by several processes
+    """
+    FUNCTIONS = ["count", "sum", "avg", "min", "max"]
+    PATTERN = re.compile(r"^\s*(\w+)\s*\(\s*(.*?)\s*\)\s*$")
+
+    def __init__(self, group_by: str=None, aggregates: list=None):
+        """
+        PRE : aggregates are written as function(column), function being one of self.FUNCTIONS (count(*) counts rows)
+        POST : No row is aggregated yet / rows are grouped by the values of group_by (a single group if None)
+        RAISES : ValueError if an aggregate is invalid
+        """
+        self.group_by = group_by
+        self.aggregates = [self.parse(aggregate) for aggregate in aggregates or ["count(*)"]]
+        self.groups = {}
+
+    @classmethod
+    def parse(cls, aggregate: str) -> tuple:
+        """
+        PRE : None
+        POST : Returns (function, column) of aggregate (column is None for count(*))
+        RAISES : ValueError if aggregate is not function(column) with a function of self.FUNCTIONS, or if only count is applied to *
+        """
+        match = cls.PATTERN.match(aggregate)
+        if not match or match.group(1).lower() not in cls.FUNCTIONS or not match.group(2):
+            raise ValueError(f"Invalid aggregate: {aggregate} (expected one of {', '.join(f'{function}(COLUMN)' for function in cls.FUNCTIONS)})")
+        function, column = match.group(1).lower(), match.group(2)
+        if column == "*":
+            if function != "count":
+                raise ValueError(f"Invalid aggregate: {aggregate} (only count applies to *)")
+            column = None
+        return function, column
+
+    @staticmethod
+    def name(function: str, column: str) -> str:
+        """
+        PRE : (function, column) is the result of Aggregation.parse
+        POST : Returns the name of the aggregate in the results
+        """
+        return f"{function}({column or '*'})"
+
+    def add(self, row: dict) -> None:
+        """
+        PRE : row is a dictionary mapping column names to string values
+        POST : row is accounted for in the aggregates of its group
+               count(column) counts the non empty values of column, the other functions ignore the values which are not numbers
+        """
+        key = row.get(self.group_by) if self.group_by else None
+        states = self.groups.get(key)
+        if states is None:
+            states = self.groups[key] = [[0, 0.0, None, None] for _ in self.aggregates]
+        for state, (function, column) in zip(states, self.aggregates):
+            if column is None:
+                state[0] += 1
+                continue
+            value = row.get(column)
+            if function == "count":
+                if value not in (None, ""):
+                    state[0] += 1
+                continue
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                continue
+            # Every function keeps [count, total, min, max] of the numbers, so that states merge the same way
+            state[0] += 1
+            state[1] += number
+            if state[2] is None or number < state[2]:
+                state[2] = number
+            if state[3] is None or number > state[3]:
+                state[3] = number
+
+    def update(self, rows) -> None:
+        """
+        PRE : rows is an iterable of dictionaries, it is only iterated once
+        POST : Each row is accounted for
+        """
+        for row in rows:
+            self.add(row)
+
+    def merge(self, other) -> None:
+        """
+        PRE : other is an Aggregation with the same group_by and aggregates, computed on rows following the ones of self
+        POST : The aggregates account for the rows of other as well, groups keeping their order of first appearance
+        """
+        for key, other_states in other.groups.items():
+            states = self.groups.get(key)
+            if states is None:
+                self.groups[key] = [list(state) for state in other_states]
+                continue
+            for state, other_state in zip(states, other_states):
+                state[0] += other_state[0]
+                state[1] += other_state[1]
+                if other_state[2] is not None and (state[2] is None or other_state[2] < state[2]):
+                    state[2] = other_state[2]
+                if other_state[3] is not None and (state[3] is None or other_state[3] > state[3]):
+                    state[3] = other_state[3]
+
+    def result(self) -> list:
+        """
+        PRE : None
+        POST : Returns one dictionary per group, in order of first appearance : the value of the grouped column (if any) and the value of each aggregate
+               (None for sum, avg, min and max of a group without any number)
+        """
+        rows = []
+        for key, states in self.groups.items():
+            row = {self.group_by: key} if self.group_by else {}
+            for (function, column), (count, total, low, high) in zip(self.aggregates, states):
+                if function == "count":
+                    value = count
+                elif not count:
+                    value = None
+                else:
+                    value = {"sum": total, "avg": total / count, "min": low, "max": high}[function]
+                row[self.name(function, column)] = value
+            rows.append(row)
+        return rows
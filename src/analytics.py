@@ -0,0 +1,321 @@
+from src.schema import COLUMN_TYPES
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles of a stream of numbers
+    Values are kept in levels of at most CAPACITY items, an item of level i standing for 2**i values
+    A full level is compacted : its sorted items are halved (one out of two kept) and moved to the next level
+    """
+    CAPACITY = 256
+
+    def __init__(self):
+        self.levels = [[]]
+        self.compactions = 0
+
+    def add(self, value: float) -> None:
+        """
+        PRE : None
+        POST : value is accounted for in the quantiles
+        """
+        level = self.levels[0]
+        level.append(value)
+        if len(level) >= self.CAPACITY:
+            self.compact(0)
+
+    def add_many(self, values) -> None:
+        """
+        PRE : values is a list (or a NumPy array) of numbers
+        POST : The sketch is in the same state as if each item of values was given to self.add in order
+        """
+        position = 0
+        while position < len(values):
+            room = self.CAPACITY - len(self.levels[0])
+            chunk = values[position:position + room]
+            self.levels[0].extend(chunk if isinstance(chunk, list) else chunk.tolist())
+            position += room
+            if len(self.levels[0]) >= self.CAPACITY:
+                self.compact(0)
+
+    def compact(self, level: int) -> None:
+        """
+        PRE : 0 <= level < len(self.levels)
+        POST : Half of the items of level are moved to level + 1 (compacting it as well if it becomes full)
+        """
+        items = sorted(self.levels[level])
+        # An odd item stays at its level, so that no weight is lost
+        self.levels[level] = [items.pop()] if len(items) % 2 else []
+        # Keeping alternately the even and the odd items avoids biasing the quantiles in one direction
+        offset = self.compactions % 2
+        self.compactions += 1
+        if level + 1 == len(self.levels):
+            self.levels.append([])
+        self.levels[level + 1].extend(items[offset::2])
+        if len(self.levels[level + 1]) >= self.CAPACITY:
+            self.compact(level + 1)
+
+    def merge(self, other) -> None:
+        """
+        PRE : other is a QuantileSketch
+        POST : The sketch accounts for the values of other as well
+        """
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append([])
+            self.levels[level].extend(items)
+        self.compactions += other.compactions
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self.CAPACITY:
+                self.compact(level)
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        PRE : 0 <= q <= 1 / at least one value was added
+        POST : Returns the smallest value whose rank reaches q times the number of values (exact as long as fewer than CAPACITY values were added)
+        """
+        weighted = sorted((value, 2 ** level) for level, items in enumerate(self.levels) for value in items)
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> dict:
+        """
+        PRE : None
+        POST : Returns the state of the sketch as a JSON compatible dictionary (see QuantileSketch.from_dict)
+        """
+        return {"levels": self.levels, "compactions": self.compactions}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        PRE : data is the result of QuantileSketch.to_dict
+        POST : Returns a sketch in the state described by data
+        """
+        sketch = cls()
+        sketch.levels = [list(items) for items in data["levels"]]
+        sketch.compactions = data["compactions"]
+        return sketch
+
+class NumericAccumulator:
+    """
+    Mergeable statistics of a numeric column
+    The variance is kept as the mean and the sum of squared deviations from it (m2), updated by Welford's method and merged by Chan's,
+    which stays exact when the values share a large offset
+    """
+    __slots__ = ("count", "total", "mean", "m2", "min", "max", "sketch")
+    QUANTILES = (0.25, 0.5, 0.75)
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float) -> None:
+        """
+        PRE : None
+        POST : value is accounted for in the statistics
+        """
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.sketch.add(value)
+
+    def add_array(self, values) -> None:
+        """
+        PRE : values is a non empty NumPy array of floats
+        POST : The statistics are the same as if each item of values was given to self.add in order (the variance up to rounding)
+        """
+        import numpy as np
+        # cumsum adds values one after the other, as self.add does
+        self.total = float(np.cumsum(np.concatenate(([self.total], values)))[-1])
+        mean = float(values.mean())
+        self.combine(len(values), mean, float(np.square(values - mean).sum()))
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.sketch.add_many(values)
+
+    def combine(self, count: int, mean: float, m2: float) -> None:
+        """
+        PRE : count > 0 / mean and m2 are the mean and the sum of squared deviations of count values
+        POST : self.count, self.mean and self.m2 account for these values as well
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def merge(self, other) -> None:
+        """
+        PRE : other is a NumericAccumulator
+        POST : The statistics account for the values of other as well
+        """
+        if not other.count:
+            return
+        self.total += other.total
+        self.combine(other.count, other.mean, other.m2)
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def result(self) -> dict:
+        """
+        PRE : at least one value was added
+        POST : Returns total, max, min, count, mean, variance (population) and approximate quartiles of the values
+        """
+        return {
+            "total": self.total,
+            "max": self.max,
+            "min": self.min,
+            "count": self.count,
+            "mean": self.total / self.count,
+            "variance": self.m2 / self.count,
+            "quantiles": {str(q): self.sketch.quantile(q) for q in self.QUANTILES}
+        }
+
+    def to_dict(self) -> dict:
+        """
+        PRE : None
+        POST : Returns the state of the accumulator as a JSON compatible dictionary (see NumericAccumulator.from_dict)
+        """
+        state = {name: getattr(self, name) for name in self.__slots__ if name != "sketch"}
+        state["sketch"] = self.sketch.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        PRE : data is the result of NumericAccumulator.to_dict
+        POST : Returns an accumulator in the state described by data
+        """
+        accumulator = cls()
+        for name in cls.__slots__:
+            if name != "sketch":
+                setattr(accumulator, name, data[name])
+        accumulator.sketch = QuantileSketch.from_dict(data["sketch"])
+        return accumulator
+
+class Analytics:
+    """
+    Mergeable analytics of rows : statistics of each numeric column and number of occurrences of each value of the other ones
+    Columns declared as text in COLUMN_TYPES are always counted, values of the other columns are counted unless they are numbers
+    """
+    def __init__(self, column_types: dict=COLUMN_TYPES):
+        """
+        PRE : column_types maps column names to their type (int, float or str)
+        POST : No row is accounted for yet
+        """
+        self.column_types = column_types
+        self.numeric = {}
+        self.categorical = {}
+
+    def add(self, row: dict) -> None:
+        """
+        PRE : row is a dictionary mapping column names to string values
+        POST : row is accounted for in the analytics
+        """
+        for key, value in row.items():
+            if self.column_types.get(key) is not str:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    self.numeric_accumulator(key).add(number)
+                    continue
+            counts = self.categorical.get(key)
+            if counts is None:
+                counts = self.categorical[key] = {}
+            counts[value] = counts.get(value, 0) + 1
+
+    def update(self, rows) -> None:
+        """
+        PRE : rows is an iterable of dictionaries, it is only iterated once
+        POST : Each row is accounted for in the analytics
+        """
+        for row in rows:
+            self.add(row)
+
+    def accumulate(self, rows):
+        """
+        PRE : rows is an iterable of dictionaries
+        POST : Yields each row of rows after accounting for it in the analytics
+        """
+        for row in rows:
+            self.add(row)
+            yield row
+
+    def add_counts(self, key: str, counts: dict) -> None:
+        """
+        PRE : counts maps values of the key column to their number of occurrences
+        POST : counts are accounted for in the analytics, as if the values were given to self.add one by one
+        """
+        current = self.categorical.setdefault(key, {})
+        for value, count in counts.items():
+            current[value] = current.get(value, 0) + count
+
+    def numeric_accumulator(self, key: str) -> NumericAccumulator:
+        """
+        PRE : None
+        POST : Returns the accumulator of the key column (created if needed)
+        """
+        accumulator = self.numeric.get(key)
+        if accumulator is None:
+            accumulator = self.numeric[key] = NumericAccumulator()
+        return accumulator
+
+    def merge(self, other) -> None:
+        """
+        PRE : other is an Analytics computed on rows following the ones of self
+        POST : The analytics account for the rows of other as well
+        """
+        for key, accumulator in other.numeric.items():
+            self.numeric_accumulator(key).merge(accumulator)
+        for key, counts in other.categorical.items():
+            self.add_counts(key, counts)
+
+    def result(self) -> tuple:
+        """
+        PRE : None
+        POST : Returns (numeric_stats, categorical_counts), see NumericAccumulator.result for the statistics of each numeric column
+        """
+        numeric_stats = {key: accumulator.result() for key, accumulator in self.numeric.items()}
+        categorical_counts = {key: dict(counts) for key, counts in self.categorical.items()}
+        return numeric_stats, categorical_counts
+
+    def to_dict(self) -> dict:
+        """
+        PRE : None
+        POST : Returns the state of the analytics as a JSON compatible dictionary (see Analytics.from_dict)
+        """
+        return {
+            "numeric": {key: accumulator.to_dict() for key, accumulator in self.numeric.items()},
+            "categorical": self.categorical
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, column_types: dict=COLUMN_TYPES):
+        """
+        PRE : data is the result of Analytics.to_dict
+        POST : Returns analytics in the state described by data
+        """
+        analytics = cls(column_types)
+        analytics.numeric = {key: NumericAccumulator.from_dict(state) for key, state in data["numeric"].items()}
+        analytics.categorical = {key: dict(counts) for key, counts in data["categorical"].items()}
+        return analytics
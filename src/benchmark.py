@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+# Run as a script, the modules are imported from the src package of the repository, as by the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.datagen import DataGen
+from src.fetcher import Fetcher
+
+class Benchmark:
+    """
+    Times each stage of a fetch (scan, filter, sort, analytics, export) on datasets generated by DataGen with the 717 seed
+    """
+    # Number of files and rows per file of each dataset
+    SCALES = {"small": (10, 200), "medium": (20, 5000), "large": (20, 50000)}
+    FILTERS = [("Stock", ">", "500"), ("Company", "<", "M")]
+    SORT = "Unit Price"
+    # Commands of main.py timed from the start of a new interpreter, on the small dataset
+    STARTUP = {"help": ["--help"], "index": ["index"], "fetch": ["-y", "fetch", "-l", "1"]}
+
+    def __init__(self, repeat: int=3, bulk: bool=False):
+        """
+        PRE : repeat > 0
+        POST : Each stage is run [repeat] times, its best time is kept / datasets are generated by DataGen.generate_bulk if bulk, DataGen.generate_data if not
+        """
+        self.repeat = repeat
+        self.bulk = bulk
+
+    def stages(self, fetcher: Fetcher) -> dict:
+        """
+        PRE : fetcher.directory contains a generated dataset
+        POST : Returns a dictionary mapping each stage name to a function running it
+        """
+        def scan():
+            return sum(1 for _ in fetcher.iter_data())
+
+        def filter_rows():
+            return sum(1 for _ in fetcher.iter_data(self.FILTERS))
+
+        def sort():
+            return sum(1 for _ in fetcher.query(self.FILTERS, self.SORT))
+
+        rows = fetcher.fetch_data(self.FILTERS)
+
+        def analytics():
+            return len(Fetcher.get_analytics(rows)[0])
+
+        def export():
+            return sum(1 for _ in fetcher.export_lines(rows, "benchmark.jsonl"))
+
+        return {"scan": scan, "filter": filter_rows, "sort": sort, "analytics": analytics, "export": export}
+
+    def measure(self, function) -> dict:
+        """
+        PRE : function takes no argument
+        POST : Returns the best time (in seconds) of [self.repeat] runs of function, and the peak memory allocated by one more run (in bytes)
+        """
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        # Tracing allocations slows the run down, it is kept out of the timed runs
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {"seconds": min(times), "peak_bytes": peak}
+
+    def run_scale(self, name: str) -> dict:
+        """
+        PRE : name is a key of self.SCALES
+        POST : Returns the results of each stage (see self.measure) on the name dataset, plus the time taken to generate it
+        """
+        files, rows = self.SCALES[name]
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            # A new DataGen is seeded again, every dataset is the same from one run to the next
+            datagen = DataGen(directory)
+            start = time.perf_counter()
+            if self.bulk:
+                datagen.generate_bulk(files, rows)
+            else:
+                datagen.generate_data(files, rows)
+            results = {"files": files, "rows": rows, "generate": {"seconds": time.perf_counter() - start}}
+            fetcher = Fetcher()
+            fetcher.directory = directory
+            for stage, function in self.stages(fetcher).items():
+                results[stage] = self.measure(function)
+        return results
+
+    def startup(self) -> dict:
+        """
+        PRE : None
+        POST : Returns, for each command of self.STARTUP, the best time of [self.repeat] runs of main.py in a new interpreter,
+               the time spent importing modules (import_seconds) and the slowest modules imported by the command, as reported by python -X importtime
+        """
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        files, rows = self.SCALES["small"]
+        results = {}
+        with tempfile.TemporaryDirectory() as home:
+            # main.py reads ~/.t201-script, the commands are run with the temporary directory as home
+            with contextlib.redirect_stdout(io.StringIO()):
+                datagen = DataGen(os.path.join(home, ".t201-script"))
+                datagen.generate_data(files, rows)
+            environment = dict(os.environ, HOME=home, USERPROFILE=home)
+            for name, arguments in self.STARTUP.items():
+                times = []
+                for _ in range(self.repeat):
+                    start = time.perf_counter()
+                    subprocess.run([sys.executable, script] + arguments, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                    times.append(time.perf_counter() - start)
+                report = subprocess.run([sys.executable, "-X", "importtime", script] + arguments, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True).stderr
+                imports = self.parse_importtime(report)
+                slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5]
+                results[name] = {"seconds": min(times), "import_seconds": sum(imports.values()), "slowest_imports": dict(slowest)}
+        return results
+
+    @staticmethod
+    def parse_importtime(report: str) -> dict:
+        """
+        PRE : report is the standard error of python -X importtime
+        POST : Returns the cumulative time (in seconds) of each top level import of report, which includes the modules it imported
+        """
+        imports = {}
+        for line in report.splitlines():
+            fields = line.split("|")
+            if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+                # Header of the report, or output of the command
+                continue
+            name = fields[2]
+            # Imports made by another module are indented below it
+            if not name.startswith("  "):
+                imports[name.strip()] = imports.get(name.strip(), 0) + int(fields[1]) / 1e6
+        return imports
+
+    def run(self, scales: list, startup: bool=False) -> dict:
+        """
+        PRE : scales are keys of self.SCALES
+        POST : Returns the results of each scale (and of self.startup if startup) along with a description of the environment, ready to be dumped to JSON
+        """
+        results = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": self.repeat,
+            "bulk": self.bulk,
+            "scales": {name: self.run_scale(name) for name in scales}
+        }
+        if startup:
+            results["startup"] = self.startup()
+        return results
+
+    @staticmethod
+    def compare(results: dict, baseline: dict) -> list:
+        """
+        PRE : results and baseline are results of self.run
+        POST : Returns one line per scale and stage (and startup command) found in both, with both times and their ratio (above 1 if results are slower)
+        """
+        lines = []
+        sections = [(name, stages, baseline.get("scales", {}).get(name, {})) for name, stages in results["scales"].items()]
+        sections.append(("startup", results.get("startup", {}), baseline.get("startup", {})))
+        for name, stages, previous_stages in sections:
+            for stage, measure in stages.items():
+                previous = previous_stages.get(stage)
+                if not isinstance(measure, dict) or not previous:
+                    continue
+                ratio = measure["seconds"] / previous["seconds"] if previous["seconds"] else float("inf")
+                lines.append(f"{name:<8} {stage:<10} {previous['seconds']:>10.4f}s {measure['seconds']:>10.4f}s {ratio:>7.2f}x")
+        return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data generation and fetching")
+    parser.add_argument("-s", "--scale", action="append", choices=list(Benchmark.SCALES), help="Datasets to benchmark, default: small and medium")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of timed runs of each stage, the best one is kept (default: 3)")
+    parser.add_argument("-b", "--bulk", action="store_true", help="Generate datasets with DataGen.generate_bulk (needs NumPy)")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON file the results are written to (default: benchmark.json)")
+    parser.add_argument("-c", "--compare", help="JSON file of previous results to compare with")
+    parser.add_argument("-S", "--startup", action="store_true", help="Also time the startup of main.py commands and report their imports (python -X importtime)")
+    args = parser.parse_args()
+
+    results = Benchmark(args.repeat, args.bulk).run(args.scale or ["small", "medium"], args.startup)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    for name, stages in results["scales"].items():
+        for stage, measure in stages.items():
+            if isinstance(measure, dict):
+                peak = f"{measure['peak_bytes'] / 1024 / 1024:>8.2f} MB" if "peak_bytes" in measure else ""
+                print(f"{name:<8} {stage:<10} {measure['seconds']:>10.4f}s {peak}")
+    for command, measure in results.get("startup", {}).items():
+        slowest = ", ".join(f"{module} {seconds * 1000:.1f}ms" for module, seconds in measure["slowest_imports"].items())
+        print(f"startup  {command:<10} {measure['seconds']:>10.4f}s imports {measure['import_seconds']:.4f}s ({slowest})")
+    print(f"[t201-script] Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        print("\n".join(Benchmark.compare(results, baseline)))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n[t201-script] Benchmark cancelled by user input")
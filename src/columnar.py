@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+import shutil
+
+try:
+    import numpy as np
+except ImportError:
+    # The cache is an optimization, everything still works from the CSV files without NumPy
+    np = None
+
+class ColumnarCache:
+    """
+    Binary copy of the CSV files of a directory, stored column by column in [directory]/.cache/columns
+    Numbers are stored as NumPy arrays, repeated strings as dictionary codes, other strings as fixed width arrays
+    Every array is read back memory-mapped, and a cached file is rebuilt as soon as its CSV file's mtime or size changes
+    """
+    DIRECTORY = os.path.join(".cache", "columns")
+    # Columns with fewer distinct values than this ratio of their rows are dictionary encoded
+    DICTIONARY_RATIO = 0.5
+
+    def __init__(self, directory: str):
+        """
+        PRE : directory contains the CSV files to cache
+        POST : self.directory is directory / self.cache_directory is the directory holding the cached columns
+        """
+        self.directory = directory
+        self.cache_directory = os.path.join(directory, self.DIRECTORY)
+
+    @staticmethod
+    def available() -> bool:
+        """
+        PRE : None
+        POST : Returns True if NumPy is installed / False if not
+        """
+        return np is not None
+
+    def load(self, filename: str):
+        """
+        Returns the columns of a CSV file, from the cache if it is up to date, building it if not
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns (header, columns) where columns is a list of Column (one per header item), or None if the file cannot be cached
+               (NumPy missing, or rows without exactly one value per header item)
+        """
+        if np is None:
+            return None
+        stat = os.stat(os.path.join(self.directory, filename))
+        cached = self.read(filename, stat)
+        if cached is not None:
+            return cached
+        return self.build(filename, stat)
+
+    def read(self, filename: str, stat: os.stat_result):
+        """
+        PRE : stat is the current os.stat of filename
+        POST : Returns (header, columns) read from the cache, or None if filename is not cached or if its cache is outdated
+        """
+        path = os.path.join(self.cache_directory, filename)
+        try:
+            with open(os.path.join(path, "meta.json"), "r") as file:
+                meta = json.load(file)
+            if meta["mtime_ns"] != stat.st_mtime_ns or meta["size"] != stat.st_size:
+                return None
+            columns = []
+            for i, description in enumerate(meta["columns"]):
+                # Memory-mapped: no copy is made until values are actually used
+                array = np.load(os.path.join(path, f"{i}.npy"), mmap_mode="r")
+                columns.append(Column(description["kind"], array, description.get("values")))
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta["header"], columns
+
+    def build(self, filename: str, stat: os.stat_result):
+        """
+        Parses a CSV file and writes its columns to the cache
+        PRE : stat is the current os.stat of filename
+        POST : Returns (header, columns) as self.load, the cache of filename is written if self.cache_directory is writable
+        """
+        parsed = self.parse(filename)
+        if parsed is None:
+            return None
+        header, columns = parsed
+        path = os.path.join(self.cache_directory, filename)
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            meta = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "header": header, "columns": []}
+            for i, column in enumerate(columns):
+                np.save(os.path.join(path, f"{i}.npy"), column.array)
+                description = {"kind": column.kind}
+                if column.values is not None:
+                    description["values"] = column.values
+                meta["columns"].append(description)
+            # meta.json is written last, a cache without it is never read
+            with open(os.path.join(path, "meta.json"), "w") as file:
+                json.dump(meta, file)
+        except OSError:
+            pass
+        return header, columns
+
+    def parse(self, filename: str):
+        """
+        Parses a CSV file into columns, without caching them
+        PRE : filename is the name of a CSV file contained in self.directory / NumPy is installed
+        POST : Returns (header, columns) as self.load
+        """
+        with open(os.path.join(self.directory, filename), "r", newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return None
+            values = [[] for _ in header]
+            for row in reader:
+                if len(row) != len(header):
+                    return None
+                for column, value in zip(values, row):
+                    column.append(value)
+        return header, [Column.encode(column, self.DICTIONARY_RATIO) for column in values]
+
+    @staticmethod
+    def rows(header: list, columns: list, batch_size: int=4096):
+        """
+        PRE : (header, columns) is the result of self.load
+        POST : Yields each row as a dictionary of strings, identical to the rows of csv.DictReader. Only batch_size rows are converted at a time
+        """
+        length = len(columns[0].array) if columns else 0
+        for start in range(0, length, batch_size):
+            batch = [column.strings(start, start + batch_size) for column in columns]
+            for values in zip(*batch):
+                yield dict(zip(header, values))
+
+    def size(self, filename: str) -> int:
+        """
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns the number of bytes of the cache of filename (0 if it is not cached)
+        """
+        path = os.path.join(self.cache_directory, filename)
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        except OSError:
+            return 0
+
+    def clear(self) -> None:
+        """
+        PRE : None
+        POST : self.cache_directory does not exist (anymore)
+        """
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+
+class Column:
+    """
+    A column of a CSV file stored as a NumPy array, of one of the following kinds :
+        - "int" / "float" : the numbers themselves
+        - "dictionary" : indexes into self.values, the distinct strings of the column
+        - "text" : the strings themselves
+    """
+    def __init__(self, kind: str, array, values: list=None):
+        self.kind = kind
+        self.array = array
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def take(self, indices):
+        """
+        PRE : indices is an array of positions in the column
+        POST : Returns a new Column containing the values at indices, in their order
+        """
+        return Column(self.kind, self.array[indices], self.values)
+
+    @classmethod
+    def concatenate(cls, columns: list):
+        """
+        PRE : columns is a non empty list of Column
+        POST : Returns a Column containing the values of each column one after the other, whose self.strings() are the ones of each column
+        """
+        kinds = {column.kind for column in columns}
+        if len(columns) == 1:
+            return columns[0]
+        if kinds == {"int"} or kinds == {"float"} or kinds == {"text"}:
+            return cls(kinds.pop(), np.concatenate([column.array for column in columns]))
+        if kinds == {"dictionary"}:
+            # Codes of each column are translated into the union of the dictionaries (kept sorted)
+            values = sorted(set().union(*(column.values for column in columns)))
+            arrays = [np.searchsorted(values, column.values).astype(np.int32)[column.array] for column in columns]
+            return cls("dictionary", np.concatenate(arrays), values)
+        # Mixed kinds cannot be merged without changing how values are written, fall back to strings
+        return cls("text", np.array([value for column in columns for value in column.strings()], dtype=str))
+
+    @classmethod
+    def encode(cls, values: list, dictionary_ratio: float):
+        """
+        PRE : values is a list of strings read from a CSV file
+        POST : Returns the most compact Column whose self.strings() returns exactly values
+        """
+        for kind, parse, dtype in (("int", int, np.int64), ("float", float, np.float64)):
+            try:
+                numbers = [parse(value) for value in values]
+            except ValueError:
+                continue
+            # Only store numbers which are written back identically ("1.50" would come back as "1.5")
+            if all(str(number) == value for number, value in zip(numbers, values)):
+                return cls(kind, np.array(numbers, dtype=dtype))
+        distinct = sorted(set(values))
+        if len(distinct) <= dictionary_ratio * len(values):
+            codes = {value: code for code, value in enumerate(distinct)}
+            return cls("dictionary", np.array([codes[value] for value in values], dtype=np.int32), distinct)
+        return cls("text", np.array(values, dtype=str))
+
+    def strings(self, start: int=0, stop: int=None) -> list:
+        """
+        PRE : None
+        POST : Returns the values of the column between rows start (included) and stop (excluded, end of the column if None) as strings, as they are written in the CSV file
+        """
+        array = self.array[start:stop]
+        if self.kind == "dictionary":
+            return [self.values[code] for code in array.tolist()]
+        return [str(value) for value in array.tolist()]
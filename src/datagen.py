@@ -1,28 +1,63 @@
 import os
 import random
-from faker import Faker
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from src.indexes import SecondaryIndex, ZoneMaps
 
 class DataGen:
-    def __init__(self):
+    def __init__(self, directory: str=None):
         """
         PRE : None
         POST :
-                - ~/.t201-script exists and is contained in self.directory
+                - directory (~/.t201-script if None) exists and is contained in self.directory
+                - Faker is neither imported nor initialised until self.fake or one of the pools is first used (see self.load_pools),
+                  so that deleting or indexing data does not pay for it
+        """
+        self.directory = directory or os.path.expanduser(f"~/.t201-script")
+        os.makedirs(self.directory, exist_ok=True)
+        self._fake = None
+
+    def load_pools(self) -> None:
+        """
+        PRE : Faker is installed
+        POST : If it was not done yet :
                 - self.fake is a Faker object (used to create fake data)
                 - the seed for random and Faker is 717
                 - self.suppliers contains a list of fake company names
                 - self.origins contains a list of arbitrary countries
                 - self.categories contains a list of arbitrary words
         """
-        self.directory = os.path.expanduser(f"~/.t201-script")
-        os.makedirs(self.directory, exist_ok=True)
-
-        self.fake = Faker()
+        if self._fake is not None:
+            return
+        from faker import Faker
+        self._fake = Faker()
         Faker.seed(717)
         random.seed(717)
-        self.suppliers = self.fake_companies()
-        self.origins = self.fake_countries()
-        self.categories = self.fake_words()
+        # Drawn in the same order as before they were loaded lazily, the generated data stays the same
+        self._suppliers = self.fake_companies()
+        self._origins = self.fake_countries()
+        self._categories = self.fake_words()
+
+    @property
+    def fake(self):
+        self.load_pools()
+        return self._fake
+
+    @property
+    def suppliers(self) -> list:
+        self.load_pools()
+        return self._suppliers
+
+    @property
+    def origins(self) -> list:
+        self.load_pools()
+        return self._origins
+
+    @property
+    def categories(self) -> list:
+        self.load_pools()
+        return self._categories
 
     def fake_cities(self, n: int) -> list:
         """
@@ -71,6 +106,7 @@ class DataGen:
         Generates [files] files with [rows] rows of data each
         PRE : self.directory exists / self.suppliers, self.origins, self.categories contain at least one item
         POST : self.directory contains [files] files named after departments (self.fake_cities), containing [rows] rows of data each. Each row of data picks a random item from self.suppliers, self.origins, self.categories
+               The secondary index and the zone maps of the files are up to date
         """
         departments = self.fake_cities(files)
         for department in departments:
@@ -90,6 +126,72 @@ class DataGen:
                     print(f"Wrote to file {department}.csv")
             except Exception as e:
                 print(f"Failed writing to file {department}.csv : {e}")
+        self.index_data()
+
+    def generate_bulk(self, files: int, rows: int, jobs: int=1) -> None:
+        """
+        Generates [files] files with [rows] rows of data each, in batches, spreading files across [jobs] processes
+        PRE : same as self.generate_data / jobs >= 0 (0 uses every core) / NumPy is installed
+        POST : same as self.generate_data, but each file is generated from its own random generator (seeded with 717 and the position of the file),
+               so that the content of the files only depends on the seed, not on the number of processes or the size of the batches. It differs from the content written by self.generate_data
+        """
+        departments = self.fake_cities(files)
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        arguments = (repeat(self.directory), departments, repeat(rows), range(len(departments)), repeat(self.suppliers), repeat(self.origins), repeat(self.categories))
+        if jobs > 1 and len(departments) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(departments))) as executor:
+                results = list(executor.map(self.write_bulk_file, *arguments))
+        else:
+            results = list(map(self.write_bulk_file, *arguments))
+        for department, error in zip(departments, results):
+            if error is None:
+                print(f"Wrote to file {department}.csv")
+            else:
+                print(f"Failed writing to file {department}.csv : {error}")
+        self.index_data()
+
+    @staticmethod
+    def write_bulk_file(directory: str, department: str, rows: int, position: int, suppliers: list, origins: list, categories: list, batch_size: int=65536):
+        """
+        Writes one file of self.generate_bulk, [batch_size] rows at a time
+        PRE : directory exists / suppliers, origins, categories contain at least one item / NumPy is installed
+        POST : directory contains [department].csv, containing [rows] rows of data drawn from generators seeded with (717, position)
+               Returns None, or the exception raised while writing the file
+        """
+        import numpy as np
+        # One generator per column, so that the content does not depend on batch_size either
+        companies, countries, words, stocks, prices = map(np.random.default_rng, np.random.SeedSequence([717, position]).spawn(5))
+        prefix = department[:3].upper()
+        try:
+            # Rows are written batch by batch through a large buffer instead of being concatenated into one string
+            with open(os.path.join(directory, f"{department}.csv"), "w", buffering=1024 * 1024) as file:
+                file.write("Product ID,Company,Origin,Category,Stock,Unit Price")
+                for start in range(1, rows + 1, batch_size):
+                    size = min(batch_size, rows + 1 - start)
+                    columns = (
+                        [f"{prefix}-{i:03}" for i in range(start, start + size)],
+                        [suppliers[i] for i in companies.integers(0, len(suppliers), size).tolist()],
+                        [origins[i] for i in countries.integers(0, len(origins), size).tolist()],
+                        [categories[i] for i in words.integers(0, len(categories), size).tolist()],
+                        map(str, stocks.integers(0, 1000, size).tolist()),
+                        map(str, (prices.integers(0, 10000, size) / 100).tolist())
+                    )
+                    file.write("\n")
+                    file.write("\n".join(map(",".join, zip(*columns))))
+        except Exception as e:
+            return e
+        return None
+
+    def index_data(self) -> None:
+        """
+        Builds the secondary index and the zone maps of the data files
+        PRE : self.directory exists
+        POST : SecondaryIndex and ZoneMaps contain an up to date entry for each CSV file of self.directory
+        """
+        filenames = [filename for filename in os.listdir(self.directory) if filename.endswith(".csv")]
+        for metadata in (SecondaryIndex(self.directory), ZoneMaps(self.directory)):
+            metadata.build(filenames)
 
     def delete_data(self):
         """
@@ -98,5 +200,10 @@ class DataGen:
         POST : self.directory does not contain any files (anymore)
         """
         for file in os.listdir(self.directory):
-            os.remove(os.path.join(self.directory, file))
+            path = os.path.join(self.directory, file)
+            if os.path.isdir(path):
+                # Caches built from the data files (.cache)
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
             print("Removed file {}".format(file))
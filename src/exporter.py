@@ -0,0 +1,304 @@
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import struct
+import sys
+from array import array
+from src.analytics import Analytics
+
+class Exporter:
+    """
+    Streaming writer (and reader) of fetched rows, as JSON Lines, CSV or a columnar binary format, optionally compressed
+    Rows are written as they come, only one row group of the columnar format is kept in memory
+    """
+    FORMATS = ["jsonl", "csv", "columnar"]
+    COMPRESSIONS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+    EXTENSIONS = {"jsonl": ".jsonl", "csv": ".csv", "columnar": ".t201c", "gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+    # Columnar format : MAGIC, header, row groups of at most GROUP_ROWS rows, a group of 0 rows, analytics
+    MAGIC = b"T201C\x01"
+    GROUP_ROWS = 65536
+    TEXT, DICTIONARY, INT, FLOAT = range(4)
+
+    def __init__(self, path: str, format: str="jsonl", compression: str=None):
+        """
+        PRE : format is contained in self.FORMATS / compression is a key of self.COMPRESSIONS or None
+        POST : Rows are exported to path (or read from it) in the given format and compression
+        RAISES : ValueError if format or compression is unknown
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Invalid export format: {format}")
+        if compression is not None and compression not in self.COMPRESSIONS:
+            raise ValueError(f"Invalid compression: {compression}")
+        self.path = path
+        self.format = format
+        self.compression = compression
+
+    @classmethod
+    def default_path(cls, format: str="jsonl", compression: str=None) -> str:
+        """
+        PRE : same as Exporter
+        POST : Returns the default name of an export (output.jsonl, output.csv.gz, ...)
+        """
+        return "output" + cls.EXTENSIONS[format] + (cls.EXTENSIONS[compression] if compression else "")
+
+    def open(self, mode: str):
+        """
+        PRE : mode is "r" or "w"
+        POST : Returns self.path opened in mode, through the compression if any (binary for the columnar format, text otherwise)
+        """
+        binary = self.format == "columnar"
+        opener = self.COMPRESSIONS.get(self.compression)
+        if opener is None:
+            return open(self.path, mode + "b") if binary else open(self.path, mode, newline="")
+        return opener(self.path, mode + "b") if binary else opener(self.path, mode + "t", newline="")
+
+    def write(self, rows, analytics: Analytics=None) -> int:
+        """
+        PRE : rows is an iterable of dictionaries with the same keys / analytics accounts for every row of rows once they are consumed (see Fetcher.query), or is None
+        POST : self.path contains every row of rows, and the result of analytics if given (for the CSV format, in [self.path].analytics.json)
+               Returns the number of rows written
+        """
+        with self.open("w") as file:
+            if self.format == "jsonl":
+                count = self.write_jsonl(file, rows, analytics)
+            elif self.format == "csv":
+                count = self.write_csv(file, rows)
+            else:
+                count = self.write_columnar(file, rows, analytics)
+        if self.format == "csv" and analytics is not None:
+            with open(f"{self.path}.analytics.json", "w") as file:
+                json.dump(analytics.result(), file)
+        return count
+
+    @staticmethod
+    def write_jsonl(file, rows, analytics: Analytics) -> int:
+        """
+        PRE : file is opened in text mode
+        POST : file contains one JSON object per row, then {"analytics": analytics.result()} if analytics is given / Returns the number of rows
+        """
+        count = 0
+        for row in rows:
+            file.write(f"{json.dumps(row)}\n")
+            count += 1
+        if analytics is not None:
+            file.write(f"{json.dumps({'analytics': analytics.result()})}\n")
+        return count
+
+    @staticmethod
+    def write_csv(file, rows) -> int:
+        """
+        PRE : file is opened in text mode without newline translation
+        POST : file contains a header (the keys of the first row) and one line per row / Returns the number of rows
+        """
+        writer = None
+        count = 0
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(file, fieldnames=list(row), lineterminator="\n")
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def write_columnar(self, file, rows, analytics: Analytics) -> int:
+        """
+        PRE : file is opened in binary mode
+        POST : file contains the rows in the columnar format, by groups of self.GROUP_ROWS rows / Returns the number of rows
+        """
+        file.write(self.MAGIC)
+        columns, group, count = None, [], 0
+        for row in rows:
+            if columns is None:
+                columns = list(row)
+                self.write_block(file, json.dumps({"columns": columns}).encode())
+            group.append(row)
+            count += 1
+            if len(group) == self.GROUP_ROWS:
+                self.write_group(file, columns, group)
+                group = []
+        if columns is None:
+            self.write_block(file, json.dumps({"columns": []}).encode())
+        if group:
+            self.write_group(file, columns, group)
+        file.write(struct.pack("<I", 0))
+        self.write_block(file, json.dumps(analytics.result()).encode() if analytics is not None else b"")
+        return count
+
+    def write_group(self, file, columns: list, group: list) -> None:
+        """
+        PRE : group is a non empty list of rows
+        POST : file contains the number of rows of group, then each of its columns encoded by self.encode
+        """
+        file.write(struct.pack("<I", len(group)))
+        for column in columns:
+            kind, payload = self.encode([row.get(column) for row in group])
+            file.write(struct.pack("<B", kind))
+            self.write_block(file, payload)
+
+    @classmethod
+    def encode(cls, values: list) -> tuple:
+        """
+        PRE : values is a list of strings (or None)
+        POST : Returns (kind, payload) : integers and floats are stored as 64 bits numbers when they read back as the same strings,
+               repeated strings as codes into a dictionary, other strings as their lengths followed by their UTF-8 bytes
+        """
+        if None not in values:
+            for kind, typecode, parse, show in ((cls.INT, "q", int, str), (cls.FLOAT, "d", float, repr)):
+                try:
+                    numbers = array(typecode, map(parse, values))
+                except (ValueError, OverflowError):
+                    continue
+                if list(map(show, numbers)) == values:
+                    return kind, cls.little_endian(numbers)
+        distinct = {}
+        codes = array("I", (distinct.setdefault(value, len(distinct)) for value in values))
+        if len(distinct) <= len(values) // 2:
+            return cls.DICTIONARY, cls.encode_text(list(distinct)) + cls.little_endian(codes)
+        return cls.TEXT, cls.encode_text(values)
+
+    @classmethod
+    def encode_text(cls, values: list) -> bytes:
+        """
+        PRE : values is a list of strings (or None)
+        POST : Returns the number of values, their lengths (-1 for None) and their concatenated UTF-8 bytes
+        """
+        encoded = [value.encode() if value is not None else None for value in values]
+        lengths = array("i", (len(value) if value is not None else -1 for value in encoded))
+        return struct.pack("<I", len(values)) + cls.little_endian(lengths) + b"".join(value for value in encoded if value is not None)
+
+    @staticmethod
+    def little_endian(numbers: array) -> bytes:
+        """
+        PRE : None
+        POST : Returns the bytes of numbers in little endian order, whatever the byte order of the machine
+        """
+        if sys.byteorder == "big":
+            numbers = array(numbers.typecode, numbers)
+            numbers.byteswap()
+        return numbers.tobytes()
+
+    @staticmethod
+    def write_block(file, payload: bytes) -> None:
+        """
+        PRE : file is opened in binary mode
+        POST : file contains the length of payload followed by payload
+        """
+        file.write(struct.pack("<I", len(payload)))
+        file.write(payload)
+
+    def read(self):
+        """
+        PRE : self.path was written by self.write with the same format and compression
+        POST : Yields each exported row, as the dictionary of strings it was exported from
+        """
+        with self.open("r") as file:
+            if self.format == "jsonl":
+                for line in file:
+                    row = json.loads(line)
+                    if list(row) != ["analytics"]:
+                        yield row
+            elif self.format == "csv":
+                yield from csv.DictReader(file)
+            else:
+                yield from self.read_columnar(file)
+
+    def read_columnar(self, file):
+        """
+        PRE : file is opened in binary mode and contains rows written by self.write_columnar
+        POST : Yields each row of file, reading one row group at a time
+        """
+        if file.read(len(self.MAGIC)) != self.MAGIC:
+            raise ValueError(f"{self.path} is not a columnar export")
+        columns = json.loads(self.read_block(file))["columns"]
+        while True:
+            (size,) = struct.unpack("<I", file.read(4))
+            if not size:
+                return
+            values = []
+            for _ in columns:
+                (kind,) = struct.unpack("<B", file.read(1))
+                values.append(self.decode(kind, self.read_block(file)))
+            for row in zip(*values):
+                yield dict(zip(columns, row))
+
+    @classmethod
+    def decode(cls, kind: int, payload: bytes) -> list:
+        """
+        PRE : kind and payload were returned by self.encode
+        POST : Returns the values given to self.encode
+        """
+        if kind == cls.INT:
+            return list(map(str, cls.numbers("q", payload)))
+        if kind == cls.FLOAT:
+            return list(map(repr, cls.numbers("d", payload)))
+        values, end = cls.decode_text(payload)
+        if kind == cls.DICTIONARY:
+            return [values[code] for code in cls.numbers("I", payload[end:])]
+        return values
+
+    @classmethod
+    def decode_text(cls, payload: bytes) -> tuple:
+        """
+        PRE : payload starts with the result of self.encode_text
+        POST : Returns (values, end) : the values encoded, and the position of the first byte following them
+        """
+        (count,) = struct.unpack_from("<I", payload)
+        lengths = cls.numbers("i", payload[4:4 + 4 * count])
+        position = 4 + 4 * count
+        values = []
+        for length in lengths:
+            if length < 0:
+                values.append(None)
+                continue
+            values.append(payload[position:position + length].decode())
+            position += length
+        return values, position
+
+    @staticmethod
+    def numbers(typecode: str, payload: bytes) -> array:
+        """
+        PRE : payload was returned by Exporter.little_endian for an array of typecode
+        POST : Returns the array
+        """
+        numbers = array(typecode)
+        numbers.frombytes(payload)
+        if sys.byteorder == "big":
+            numbers.byteswap()
+        return numbers
+
+    @staticmethod
+    def read_block(file) -> bytes:
+        """
+        PRE : file is positioned at a block written by Exporter.write_block
+        POST : Returns its payload
+        """
+        (length,) = struct.unpack("<I", file.read(4))
+        return file.read(length)
+
+    def read_analytics(self):
+        """
+        PRE : same as self.read
+        POST : Returns the analytics exported with the rows (as loaded from JSON), or None if there are none
+        """
+        if self.format == "csv":
+            try:
+                with open(f"{self.path}.analytics.json", "r") as file:
+                    return json.load(file)
+            except FileNotFoundError:
+                return None
+        if self.format == "jsonl":
+            analytics = None
+            with self.open("r") as file:
+                for line in file:
+                    row = json.loads(line)
+                    if list(row) == ["analytics"]:
+                        analytics = row["analytics"]
+            return analytics
+        with self.open("r") as file:
+            # The analytics follow the last row group
+            for _ in self.read_columnar(file):
+                pass
+            payload = self.read_block(file)
+        return json.loads(payload) if payload else None
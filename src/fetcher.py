@@ -1,13 +1,46 @@
 import json
+import heapq
 import operator
 import csv
 import os
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, nullcontext
+from itertools import chain, islice, repeat
+from src.aggregation import Aggregation
+from src.analytics import Analytics
+from src.columnar import ColumnarCache
+from src.indexes import FileMetadata, SecondaryIndex, ZoneMaps
+from src.profiler import Profiler
+from src.results import ResultCache
+from src.schema import COLUMN_TYPES, Record, is_numeric
 
 class Fetcher:
     OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge}
+    # External sorts write runs of at least MIN_RUN_ROWS rows, and merge at most MERGE_FAN_IN of them at once
+    MIN_RUN_ROWS = 1024
+    MERGE_FAN_IN = 16
 
-    def __init__(self):
+    def __init__(self, use_cache: bool=False, use_index: bool=False, use_results: bool=False):
+        """
+        PRE : None
+        POST : self.directory is ~/.t201-script / self.use_cache is True if files should be read from their columnar cache (see ColumnarCache, needs NumPy)
+               self.use_index is True if filters should only read the rows listed by the secondary index (see SecondaryIndex) and the blocks allowed by the zone maps (see ZoneMaps)
+               self.use_results is True if queries should be answered from the results of identical earlier queries when the files did not change (see ResultCache)
+               self.pruned_files and self.pruned_blocks are the number of files and blocks skipped by the last scan
+               self.failed_files is the number of files which could not be read (entirely) by the last scan of self.iter_data
+               self.profiler is the Profiler recording the stages of the scans, None if they are not profiled
+        """
         self.directory = os.path.expanduser("~/.t201-script")
+        self.use_cache = use_cache and ColumnarCache.available()
+        self.use_index = use_index
+        self.use_results = use_results
+        self.pruned_files = 0
+        self.pruned_blocks = 0
+        self.failed_files = 0
+        self.profiler = None
 
     @staticmethod
     def get_column_type(value):
@@ -22,92 +55,617 @@ class Fetcher:
         except ValueError:
             return str
 
-    def fetch_data(self, filters: list=None, sort: str=None, reverse: bool=False, columns: list=None) -> list:
+    def fetch_data(self, filters: list=None, sort: str=None, reverse: bool=False, columns: list=None, jobs: int=1, limit: int=None) -> list:
         """
         Fetches data from CSV files contained in self.directory
-        PRE : filters contains three items (key, operator, value) or is None / sort contains one item (key corresponding to a column header) or is None
+        PRE : filters contains three items (key, operator, value) or is None / sort contains one item (key corresponding to a column header) or is None / jobs >= 0 / limit > 0 or None
         POST : Returns a list containing each CSV row containing the specified columns, matching the filters (all rows if filters is None), sorted by sort (not sorted if sort is None)
+               Files are scanned by [jobs] worker processes (0 uses every core), the result is the same as a sequential scan
+               Only the first [limit] rows are returned if limit is given
         """
-        data = []
-        for filename in os.listdir(self.directory):
-            try:
-                with open(os.path.join(self.directory, filename), "r") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if self.row_matches_filters(row, filters):
-                            if columns:
-                                row = {key: row[key] for key in columns}
-                            data.append(row)
-            except Exception as e:
-                print(f"Error processing file {filename} : {e}")
+        return list(self.query(filters, sort, reverse, columns, jobs, limit))
+
+    def query(self, filters: list=None, sort: str=None, reverse: bool=False, columns: list=None, jobs: int=1, limit: int=None, memory_limit: float=None, analytics: Analytics=None):
+        """
+        Streaming counterpart of self.fetch_data
+        PRE : same as self.fetch_data / memory_limit > 0 (in MB) or None
+        POST : Returns an iterator over the rows self.fetch_data would return. Rows are only kept in memory if sort is given, up to memory_limit if given (see self.sort_data)
+               Once the iterator is consumed, analytics (if given) accounts for each returned row. Without limit, it is computed during the scan (by the workers if jobs > 1)
+               If self.use_results, the rows (and analytics) of an identical earlier query are returned without reading the files if they did not change since
+               Results are not cached if a file could not be read, they would miss its rows
+        """
+        if self.use_results:
+            results = ResultCache(self.directory)
+            with self.stage("results"):
+                key = results.key({"filters": filters, "sort": sort, "reverse": reverse, "columns": columns, "limit": limit}, self.list_files())
+                cached = results.get(key)
+            if cached is not None:
+                return self.cached_rows(*cached, analytics)
+        data = self.iter_data(filters, columns, jobs, None if limit else analytics)
         if sort:
-            if data:
-                column_type = self.get_column_type(data[0][sort])
-                data.sort(key=lambda d: column_type(d[sort]), reverse=reverse)
+            data = self.timed("sort", self.sort_data(data, sort, reverse, limit, memory_limit))
+        elif limit:
+            data = islice(data, limit)
+        if limit and analytics is not None:
+            # Only the returned rows are analysed
+            data = self.timed("analytics", analytics.accumulate(data))
+        if self.use_results:
+            data = self.cache_rows(results, key, data, analytics)
         return data
 
+    @staticmethod
+    def cached_rows(rows: list, state: dict, analytics: Analytics=None):
+        """
+        PRE : (rows, state) is a result of ResultCache.get / analytics is a new Analytics or None
+        POST : Returns an iterator over rows. Once it is consumed, analytics (if given) accounts for each row, restored from state if the analytics were cached
+        """
+        if analytics is None:
+            return iter(rows)
+        if state is None:
+            return analytics.accumulate(rows)
+        analytics.merge(Analytics.from_dict(state))
+        return iter(rows)
+
+    def cache_rows(self, results: ResultCache, key: str, rows, analytics: Analytics=None):
+        """
+        PRE : key is the ResultCache.key of the query returning rows / analytics accounts for every row of rows once they are consumed, or is None
+        POST : Yields each row of rows. Once they are all consumed, they are cached under key with the state of analytics,
+               unless they take more than results.max_result_bytes or a file could not be read while scanning them (see self.failed_files)
+               At most results.max_result_bytes of encoded rows are kept in memory, rows of larger results are not kept at all
+        """
+        encoded, size = [], 0
+        for row in rows:
+            if encoded is not None:
+                line = json.dumps(row)
+                size += len(line) + 2
+                if size <= results.max_result_bytes:
+                    encoded.append(line)
+                else:
+                    # Too large to be cached, the result is streamed as without the cache
+                    encoded = None
+            yield row
+        if encoded is not None and not self.failed_files:
+            results.put_encoded(key, encoded, analytics.to_dict() if analytics is not None else None)
+
+    def fetch_many(self, queries: list, jobs: int=1) -> list:
+        """
+        Answers several fetches with a single scan of the data files
+        PRE : queries is a list of dictionaries whose keys are arguments of self.fetch_data (filters, sort, reverse, columns, limit), all optional / jobs >= 0
+        POST : Returns, for each query, (rows, analytics) : the list self.fetch_data would return and its self.get_analytics
+        RAISES : ValueError if any query is invalid (see self.check_query), before any file is opened
+        """
+        for query in queries:
+            self.check_query(query)
+        predicates = [self.compile_filters(query.get("filters")) for query in queries]
+        filenames = self.list_files()
+        results = [[] for _ in queries]
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and len(filenames) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(filenames))) as executor:
+                partials = executor.map(self.scan_file_many, filenames, repeat(queries))
+                for partial in partials:
+                    for result, rows in zip(results, partial):
+                        result.extend(rows)
+        else:
+            for filename in filenames:
+                for result, rows in zip(results, self.scan_file_many(filename, queries, predicates)):
+                    result.extend(rows)
+        answers = []
+        for query, rows in zip(queries, results):
+            limit = query.get("limit")
+            if query.get("sort"):
+                rows = list(self.sort_data(rows, query["sort"], query.get("reverse", False), limit))
+            elif limit:
+                rows = rows[:limit]
+            answers.append((rows, self.get_analytics(rows)))
+        return answers
+
+    @classmethod
+    def check_query(cls, query: dict) -> None:
+        """
+        PRE : query is a dictionary whose keys are arguments of self.fetch_data (filters, sort, reverse, columns, limit), all optional
+        POST : None
+        RAISES : ValueError if a filter is invalid (see self.compile_filters), if the rows are sorted by a column which is not fetched, or if the limit is not positive
+        """
+        cls.compile_filters(query.get("filters"))
+        sort, columns, limit = query.get("sort"), query.get("columns"), query.get("limit")
+        if sort and columns and sort not in columns:
+            raise ValueError(f"Cannot sort by '{sort}', which is not one of the fetched columns ({', '.join(columns)})")
+        if limit is not None and limit <= 0:
+            raise ValueError(f"The limit must be positive, not {limit}")
+
+    def scan_file_many(self, filename: str, queries: list, predicates: list=None) -> list:
+        """
+        Reads a single CSV file once for several fetches
+        PRE : filename is the name of a file contained in self.directory / queries is the argument of self.fetch_many / predicates contains the compiled filters of each query, or is None
+        POST : Returns, for each query, the list of the rows of the file matching its filters, restricted to its columns
+        """
+        if predicates is None:
+            predicates = [self.compile_filters(query.get("filters")) for query in queries]
+        results = [[] for _ in queries]
+        matchers = list(zip(predicates, [query.get("columns") for query in queries], results))
+        for row in self.iter_file(filename, None, lambda row: True):
+            for predicate, columns, result in matchers:
+                if predicate(row):
+                    result.append({key: row[key] for key in columns} if columns else row)
+        return results
+
+    def aggregate(self, filters: list=None, group_by: str=None, aggregates: list=None, jobs: int=1) -> Aggregation:
+        """
+        Aggregates the rows matching the filters during the scan, without keeping them
+        PRE : filters contains (key, operator, value) tuples or is None / group_by and aggregates are arguments of Aggregation / jobs >= 0
+        POST : Returns the Aggregation of every matching row. Each file is aggregated on its own (by [jobs] worker processes, 0 uses every core) then merged in order
+        RAISES : ValueError if a filter or an aggregate is invalid, before any file is opened
+        """
+        self.compile_filters(filters)
+        aggregation = Aggregation(group_by, aggregates)
+        with self.stage("list"):
+            filenames = self.list_files()
+        selections = [None] * len(filenames)
+        if self.use_index:
+            with self.stage("index"):
+                selections = self.select_rows(filenames, filters)
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        arguments = (filenames, repeat(filters), repeat(group_by), repeat(aggregates), selections)
+        if jobs > 1 and len(filenames) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(filenames))) as executor:
+                partials = list(self.map_workers(executor, self.aggregate_file, *arguments))
+        else:
+            partials = map(self.aggregate_file, *arguments)
+        for partial in partials:
+            aggregation.merge(partial)
+        return aggregation
+
+    def aggregate_file(self, filename: str, filters: list, group_by: str, aggregates: list, selection: tuple=None) -> Aggregation:
+        """
+        PRE : same as self.scan_file
+        POST : Returns the Aggregation of the rows of the file matching the filters
+        """
+        aggregation = Aggregation(group_by, aggregates)
+        with self.stage("aggregate"):
+            aggregation.update(self.iter_file(filename, None, self.compile_filters(filters), selection))
+        return aggregation
+
+    def map_workers(self, executor: ProcessPoolExecutor, method, *arguments):
+        """
+        PRE : method is a method of self / arguments are iterables of its arguments
+        POST : Returns an iterator over the results of executor.map(method, *arguments)
+               If profiling, each call is profiled by its worker and the profiles are merged into self.profiler as the results come
+        """
+        if self.profiler is None:
+            return executor.map(method, *arguments)
+        return self.merge_profiles(executor.map(self.profiled, repeat(method.__name__), *arguments))
+
+    def profiled(self, name: str, *arguments) -> tuple:
+        """
+        Runs in a worker process, on its own copy of the fetcher
+        PRE : name is the name of a method of self accepting arguments
+        POST : Returns (result, profiler) : the result of the method and the Profiler of its stages
+        """
+        self.profiler = Profiler()
+        return getattr(self, name)(*arguments), self.profiler
+
+    def merge_profiles(self, results):
+        """
+        PRE : results is an iterable of results of self.profiled
+        POST : Yields the result of each call once its profile is merged into self.profiler
+        """
+        for result, profiler in results:
+            self.profiler.merge(profiler)
+            yield result
+
+    def iter_data(self, filters: list=None, columns: list=None, jobs: int=1, analytics: Analytics=None):
+        """
+        Streams data from CSV files contained in self.directory, without keeping it in memory
+        PRE : filters contains three items (key, operator, value) or is None / jobs >= 0
+        POST : Yields each CSV row containing the specified columns and matching the filters, in the same order as self.fetch_data without sort
+               analytics (if given) accounts for each yielded row
+        RAISES : ValueError if a filter is invalid, before any file is opened
+        """
+        predicate = self.compile_filters(filters)
+        self.failed_files = 0
+        with self.stage("list"):
+            filenames = self.list_files()
+        selections = None
+        if self.use_index:
+            with self.stage("index"):
+                selections = self.select_rows(filenames, filters)
+        # Without workers, scanning is timed by the read, filter and analytics stages of each file
+        for rows in self.timed("scan", self.scan_files(filenames, filters, columns, jobs, predicate, analytics, selections)):
+            yield from rows
+
+    def sort_data(self, rows, sort: str, reverse: bool=False, limit: int=None, memory_limit: float=None):
+        """
+        Sorts rows by the values of the sort column
+        PRE : rows is an iterable of dictionaries containing sort as key / limit > 0 or None / memory_limit > 0 (in MB) or None
+        POST : Returns an iterator over rows sorted by sort (in descending order if reverse), equal values keeping their order
+               If limit is given, only the first [limit] rows are returned, selected with a heap instead of sorting every row
+               If memory_limit is given, sorted runs exceeding it are written to temporary files then merged (see self.external_sort)
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return iter([])
+        rows = chain([first], rows)
+        key = self.sort_key(sort, first[sort])
+        if limit:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            return iter(select(limit, rows, key=key))
+        if memory_limit is None:
+            return iter(sorted(rows, key=key, reverse=reverse))
+        return self.external_sort(rows, key, reverse, memory_limit)
+
+    @classmethod
+    def sort_key(cls, sort: str, sample: str):
+        """
+        PRE : sample is a value of the sort column
+        POST : Returns a function taking a row and returning its sort value, parsed as a number if the column is numeric (declared in COLUMN_TYPES, or guessed from sample for other columns)
+        """
+        column_type = COLUMN_TYPES.get(sort) or cls.get_column_type(sample)
+        if is_numeric(column_type):
+            return lambda row: float(row[sort])
+        return operator.itemgetter(sort)
+
+    @classmethod
+    def external_sort(cls, rows, key, reverse: bool, memory_limit: float):
+        """
+        Sorts rows with a bounded amount of memory
+        PRE : rows is an iterable of dictionaries / key is the result of Fetcher.sort_key / memory_limit > 0 (in MB)
+        POST : Yields rows sorted by key, equal keys keeping their order. Rows are buffered until they reach about memory_limit (at least self.MIN_RUN_ROWS rows),
+               each full buffer is sorted and written to a temporary file (run), then the runs are merged with heapq.merge
+               At most self.MERGE_FAN_IN runs are open at once : while there are more, they are merged by groups into longer runs
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            runs = []
+            buffer, capacity = [], None
+            for position, row in enumerate(rows):
+                if capacity is None:
+                    row_size = sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+                    capacity = max(cls.MIN_RUN_ROWS, int(memory_limit * 1024 * 1024 / row_size))
+                # The position makes entries unique, so the merge is stable whatever the direction
+                buffer.append((key(row), -position if reverse else position, row))
+                if len(buffer) >= capacity:
+                    buffer.sort(key=operator.itemgetter(0, 1), reverse=reverse)
+                    runs.append(cls.write_run(directory, buffer))
+                    buffer = []
+            buffer.sort(key=operator.itemgetter(0, 1), reverse=reverse)
+            while len(runs) > cls.MERGE_FAN_IN:
+                runs = [cls.merge_runs(directory, runs[start:start + cls.MERGE_FAN_IN], reverse) for start in range(0, len(runs), cls.MERGE_FAN_IN)]
+            with ExitStack() as stack:
+                files = [stack.enter_context(open(run, "rb")) for run in runs]
+                merged = heapq.merge(buffer, *(cls.read_run(file) for file in files), key=operator.itemgetter(0, 1), reverse=reverse)
+                for entry in merged:
+                    yield entry[2]
+
+    @staticmethod
+    def write_run(directory: str, entries) -> str:
+        """
+        PRE : directory exists / entries is an iterable of sorted entries of Fetcher.external_sort
+        POST : Returns the path of a new file of directory containing entries, closed once written
+        """
+        descriptor, path = tempfile.mkstemp(dir=directory, suffix=".run")
+        with os.fdopen(descriptor, "wb") as run:
+            pickler = pickle.Pickler(run)
+            for entry in entries:
+                pickler.dump(entry)
+                # Entries are read back one at a time, without the pickler remembering each of them
+                pickler.clear_memo()
+        return path
+
+    @classmethod
+    def merge_runs(cls, directory: str, runs: list, reverse: bool) -> str:
+        """
+        PRE : runs are paths returned by Fetcher.write_run, sorted in the same direction
+        POST : Returns the path of a new run containing the entries of every run of runs in order, runs are removed
+        """
+        with ExitStack() as stack:
+            files = [stack.enter_context(open(run, "rb")) for run in runs]
+            path = cls.write_run(directory, heapq.merge(*(cls.read_run(file) for file in files), key=operator.itemgetter(0, 1), reverse=reverse))
+        for run in runs:
+            os.remove(run)
+        return path
+
+    @staticmethod
+    def read_run(run):
+        """
+        PRE : run is a file written by Fetcher.write_run, opened in binary mode and positioned at its start
+        POST : Yields each entry of run in order
+        """
+        unpickler = pickle.Unpickler(run)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+    def select_rows(self, filenames: list, filters: list) -> list:
+        """
+        Uses the secondary index and the zone maps to find the rows of each file which may match the filters
+        PRE : filenames are names of CSV files contained in self.directory
+        POST : Returns, for each file of filenames, None if every row has to be read, or (header, spans) listing the only rows to read (see FileMetadata.read_rows)
+               Zone maps of files which changed are refreshed if a filter can use them / self.pruned_files counts the files which will not be read, self.pruned_blocks the blocks skipped in the other files
+        """
+        # Entries of the index are only read for the files filtered on an indexed column
+        index = SecondaryIndex(self.directory).load()
+        zone_maps = ZoneMaps(self.directory)
+        if any(key in ZoneMaps.COLUMNS for key, _, _ in filters or []):
+            try:
+                zone_maps.build(filenames)
+            except OSError:
+                zone_maps.load()
+        self.pruned_files = self.pruned_blocks = 0
+        selections = []
+        for filename in filenames:
+            selection = index.selection(filename, filters)
+            blocks = zone_maps.spans(filename, filters)
+            if blocks is not None:
+                if blocks:
+                    # Blocks of files skipped altogether are only counted as a pruned file
+                    self.pruned_blocks += len(zone_maps.files[filename]["blocks"]) - len(blocks)
+                if selection is None:
+                    selection = zone_maps.files[filename]["header"], blocks
+                else:
+                    selection = selection[0], zone_maps.restrict(filename, selection[1], blocks)
+            if selection is not None and not selection[1]:
+                self.pruned_files += 1
+            selections.append(selection)
+        return selections
+
+    def list_files(self) -> list:
+        """
+        PRE : self.directory exists
+        POST : Returns the names of the CSV files contained in self.directory (exports and other files are ignored)
+        """
+        return [filename for filename in os.listdir(self.directory) if filename.endswith(".csv")]
+
+    def scan_files(self, filenames: list, filters: list=None, columns: list=None, jobs: int=1, predicate=None, analytics: Analytics=None, selections: list=None):
+        """
+        Scans each file of filenames, in parallel if more than one job is requested
+        PRE : filenames are names of files contained in self.directory / jobs >= 0 / predicate is the result of self.compile_filters(filters) or None
+              selections is the result of self.select_rows(filenames, filters) or None
+        POST : Yields one iterable of matching rows per file, in the order of filenames (lists read by the workers, or lazy generators if jobs is 1)
+               analytics (if given) accounts for the rows of each file once they are consumed
+               Files whose selection is empty are not opened, other files with a selection only read the selected rows
+        """
+        if selections is None:
+            selections = [None] * len(filenames)
+        else:
+            kept = [(filename, selection) for filename, selection in zip(filenames, selections) if selection is None or selection[1]]
+            filenames, selections = [filename for filename, _ in kept], [selection for _, selection in kept]
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and len(filenames) > 1:
+            # Each worker filters and projects whole files, results are merged back in listing order
+            # Compiled filters cannot be sent to the workers, each of them compiles its own
+            # Workers also analyse their own files, partial analytics are merged here
+            with ProcessPoolExecutor(max_workers=min(jobs, len(filenames))) as executor:
+                for rows, partial, failed in self.map_workers(executor, self.scan_file, filenames, repeat(filters), repeat(columns), repeat(analytics is not None), selections):
+                    if partial is not None:
+                        analytics.merge(partial)
+                    self.failed_files += failed
+                    yield rows
+        else:
+            if predicate is None:
+                predicate = self.compile_filters(filters)
+            for filename, selection in zip(filenames, selections):
+                rows = self.iter_file(filename, columns, predicate, selection)
+                yield rows if analytics is None else self.timed("analytics", analytics.accumulate(rows))
+
+    def scan_file(self, filename: str, filters: list=None, columns: list=None, analyse: bool=False, selection: tuple=None) -> tuple:
+        """
+        Reads a single CSV file contained in self.directory
+        PRE : filename is the name of a file contained in self.directory / selection is the result of self.select_rows for filename, or None
+        POST : Returns (rows, analytics, failed) : a list containing each row of the file matching the filters, restricted to the specified columns (stopping where the file could not be read),
+               the Analytics of these rows if analyse (None if not), and 1 if the file could not be read (0 if it was)
+        """
+        failed = self.failed_files
+        rows = self.iter_file(filename, columns, self.compile_filters(filters), selection)
+        analytics = Analytics() if analyse else None
+        rows = list(rows if analytics is None else self.timed("analytics", analytics.accumulate(rows)))
+        return rows, analytics, self.failed_files - failed
+
+    def iter_file(self, filename: str, columns: list, predicate, selection: tuple=None):
+        """
+        Streams a single CSV file contained in self.directory
+        PRE : filename is the name of a file contained in self.directory / predicate is the result of self.compile_filters
+              selection is the result of self.select_rows for filename, or None
+        POST : Yields each row of the file matching predicate, restricted to the specified columns (stops if the file could not be read, counting it in self.failed_files)
+               Only the rows of selection are read if it is given, rows are read from the columnar cache instead of the CSV file if self.use_cache
+        """
+        stats = self.profiler.file(filename) if self.profiler is not None else None
+        try:
+            if selection is not None:
+                yield from self.filter_file(FileMetadata.read_rows(self.directory, filename, *selection, stats), columns, predicate, stats)
+                return
+            cached = None
+            if self.use_cache:
+                with self.stage("cache", stats):
+                    cached = ColumnarCache(self.directory).load(filename)
+            if cached:
+                if stats is not None:
+                    stats["bytes"] += ColumnarCache(self.directory).size(filename)
+                yield from self.filter_file(ColumnarCache.rows(*cached), columns, predicate, stats)
+            else:
+                path = os.path.join(self.directory, filename)
+                with open(path, "r") if stats is None else Profiler.open(path, stats) as f:
+                    yield from self.filter_file(csv.DictReader(f), columns, predicate, stats)
+        except Exception as e:
+            self.failed_files += 1
+            print(f"Error processing file {filename} : {e}")
+
+    def filter_file(self, rows, columns: list, predicate, stats: dict=None):
+        """
+        PRE : same as Fetcher.filter_rows / stats is the result of self.profiler.file for the file of rows, or None if not profiling
+        POST : Returns the iterator of Fetcher.filter_rows. If profiling, reading and filtering the rows are timed as the read and filter stages, and accounted for in stats
+        """
+        if stats is None:
+            return self.filter_rows(rows, columns, predicate)
+        rows = self.profiler.timed("read", rows, stats, "rows_scanned")
+        return self.profiler.timed("filter", self.filter_rows(rows, columns, predicate), stats, "rows_matched", "seconds")
+
+    def stage(self, name: str, stats: dict=None):
+        """
+        PRE : stats is the result of self.profiler.file or None
+        POST : Returns a context manager timing its block as stage name of self.profiler (and in stats), doing nothing if not profiling
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, stats, "seconds" if stats is not None else None)
+
+    def timed(self, name: str, rows):
+        """
+        PRE : rows is an iterable
+        POST : Returns rows, timed as stage name of self.profiler if profiling (see Profiler.timed)
+        """
+        return rows if self.profiler is None else self.profiler.timed(name, rows)
+
+    @staticmethod
+    def filter_rows(rows, columns: list, predicate):
+        """
+        PRE : rows is an iterable of dictionaries / predicate is the result of Fetcher.compile_filters
+        POST : Yields each row matching predicate, restricted to the specified columns
+        """
+        for row in rows:
+            if predicate(row):
+                if columns:
+                    row = {key: row[key] for key in columns}
+                yield row
+
     def row_matches_filters(self, row: dict, filters: list) -> bool:
         """
         PRE : row contains keys corresponding to column names
         POST : Returns True if row matches filters (or if filters is None) / False if not
         RAISES : ValueError if the operator (filters[1]) is not a valid operator (contained in self.OPERATORS)
         """
-        if not filters:
-            return True
-        for key, op, value in filters:
-            op_func = self.OPERATORS.get(op)
-            if not op_func:
-                raise ValueError(f"Invalid operator: {op}")
+        return self.compile_filters(filters)(row)
 
+    @classmethod
+    def compile_filters(cls, filters: list):
+        """
+        Compiles filters into a single predicate, so that each row costs one call
+        PRE : filters contains (key, operator, value) tuples or is None
+        POST : Returns a function taking a row and returning True if it matches every filter (always True if filters is None)
+        RAISES : ValueError if an operator is not contained in self.OPERATORS, or if a numeric column is compared to a non numeric value
+        """
+        return cls.combine([cls.compile_filter(key, op, value) for key, op, value in filters or []])
+
+    @classmethod
+    def compile_record_filters(cls, filters: list):
+        """
+        Compiles filters into a single predicate taking a Record, which compares its numbers without parsing them again
+        PRE : same as self.compile_filters
+        POST : Returns a function taking a Record and returning what the result of self.compile_filters would return for it
+        RAISES : same as self.compile_filters
+        """
+        predicates = []
+        for key, op, value in filters or []:
+            predicate = cls.compile_filter(key, op, value)
+            if key in Record.ATTRIBUTES and is_numeric(COLUMN_TYPES[key]):
+                predicate = cls.compile_record_filter(Record.ATTRIBUTES[key], cls.OPERATORS[op], float(value), predicate)
+            elif key in Record.ATTRIBUTES:
+                predicate = cls.compile_record_filter(Record.ATTRIBUTES[key], cls.OPERATORS[op], value, None)
+            predicates.append(predicate)
+        return cls.combine(predicates)
+
+    @staticmethod
+    def compile_record_filter(attribute: str, op_func, value, fallback):
+        """
+        PRE : attribute is a slot of Record / fallback is the predicate of the filter for dictionaries, or None if the column holds strings
+        POST : Returns a function taking a Record and returning op_func(its attribute, value), or fallback(record) if it holds a string it could not parse
+        """
+        getter = operator.attrgetter(attribute)
+        if fallback is None:
+            return lambda record: op_func(getter(record), value)
+
+        def predicate(record):
+            record_value = getter(record)
+            if record_value.__class__ is str:
+                return fallback(record)
+            return op_func(record_value, value)
+        return predicate
+
+    @staticmethod
+    def combine(predicates: list):
+        """
+        PRE : predicates is a list of functions taking a row and returning a bool
+        POST : Returns a function taking a row and returning True if every predicate does (always True if predicates is empty)
+        """
+        if not predicates:
+            return lambda row: True
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda row: all(predicate(row) for predicate in predicates)
+
+    @classmethod
+    def compile_filter(cls, key: str, op: str, value: str):
+        """
+        Compiles a single (key, operator, value) filter
+        PRE : None
+        POST : Returns a function taking a row and returning True if row[key] compared to value by op is True
+               Values are compared as numbers if the column is numeric (declared in COLUMN_TYPES, or guessed from value for other columns), as strings if not
+        RAISES : ValueError if op is not contained in self.OPERATORS, or if a numeric column is compared to a non numeric value
+        """
+        op_func = cls.OPERATORS.get(op)
+        if not op_func:
+            raise ValueError(f"Invalid operator: {op}")
+        column_type = COLUMN_TYPES.get(key) or cls.get_column_type(value)
+        if not is_numeric(column_type):
+            return lambda row: op_func(row.get(key), value)
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for numeric column {key}: {value}")
+
+        def predicate(row):
             row_value = row.get(key)
             try:
-                # Parse numbers
-                row_value = float(row_value)
-                value = float(value)
+                return op_func(float(row_value), number)
             except ValueError:
                 # Keep strings as strings
-                pass
-
-            if not op_func(row_value, value):
-                return False
-        return True
+                return op_func(row_value, value)
+        return predicate
 
     @staticmethod
-    def get_analytics(data: list) -> tuple:
+    def get_analytics(data) -> tuple:
         """
         Generate analytics from the input data
-        PRE : data is a list of dictionaries containing valid column names
-        POST :
-        """
-        numeric_stats = {}
-        categorical_counts = {}
-
-        for row in data:
-            for key, value in row.items():
-                try:
-                    numeric_value = float(value)
-                    if key not in numeric_stats:
-                        numeric_stats[key] = {
-                            "total": 0,
-                            "max": numeric_value,
-                            "min": numeric_value,
-                            "count": 0
-                        }
-                    numeric_stats[key]["total"] += numeric_value
-                    numeric_stats[key]["max"] = max(numeric_value, numeric_stats[key]["max"])
-                    numeric_stats[key]["min"] = min(numeric_value, numeric_stats[key]["min"])
-                    numeric_stats[key]["count"] += 1
-                except ValueError:
-                    # If the value is not numeric
-                    if key not in categorical_counts:
-                        categorical_counts[key] = {}
-                    categorical_counts[key][value] = categorical_counts[key].get(value, 0) + 1
-
-        for key, stats in numeric_stats.items():
-            # Compute means once all the data is fetched
-            stats["mean"] = stats["total"] / stats["count"]
-
-        return numeric_stats, categorical_counts
+        PRE : data is an iterable (list or generator) of dictionaries containing valid column names, it is only iterated once
+        POST : Returns (numeric_stats, categorical_counts) : statistics of each numeric column (see NumericAccumulator.result), and the number of occurrences of each value of the other columns
+        """
+        analytics = Analytics()
+        analytics.update(data)
+        return analytics.result()
+
+    def export_lines(self, rows, filename: str="output.jsonl"):
+        """
+        Exports rows to a JSON Lines file in self.directory while passing them through, one row at a time
+        PRE : self.directory exists / rows is an iterable of dictionaries
+        POST : Yields each row of rows. Once they are all consumed, filename exists in self.directory and contains one JSON object per row
+        """
+        try:
+            file = open(os.path.join(self.directory, filename), "w")
+        except Exception as e:
+            print(f"Error processing file {filename} : {e}")
+            yield from rows
+            return
+        with file:
+            for row in rows:
+                file.write(f"{json.dumps(row)}\n")
+                yield row
+
+    def export_analytics(self, analytics: tuple, filename: str="output.jsonl") -> None:
+        """
+        Appends analytics to a JSON Lines export in self.directory
+        PRE : self.directory exists / analytics is the result of self.get_analytics
+        POST : The last line of filename is a JSON object whose only key is "analytics"
+        """
+        try:
+            with open(os.path.join(self.directory, filename), "a") as file:
+                file.write(f"{json.dumps({'analytics': analytics})}\n")
+        except Exception as e:
+            print(f"Error processing file {filename} : {e}")
 
     def export_data(self, content: list) -> None:
         """
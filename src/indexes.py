@@ -0,0 +1,413 @@
+import bisect
+import csv
+import json
+import os
+import shutil
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from src.schema import COLUMN_TYPES, is_numeric
+
+class FileMetadata(ABC):
+    """
+    Metadata describing each CSV file of a directory, stored as JSON in [directory]/[PATH]
+    An entry is only used while the file keeps the mtime and size it had when it was described
+    Subclasses set PATH and implement describe
+    """
+    PATH = None
+
+    def __init__(self, directory: str):
+        """
+        PRE : directory contains the CSV files to describe
+        POST : self.path is the path of the metadata file / self.files maps file names to their entry (empty until self.load or self.build)
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.PATH)
+        self.files = {}
+
+    def load(self):
+        """
+        PRE : None
+        POST : self.files contains the entries of the metadata file (none if it does not exist or cannot be read) / Returns self
+        """
+        try:
+            with open(self.path, "r") as file:
+                self.files = json.load(file)["files"]
+        except (OSError, ValueError, KeyError):
+            self.files = {}
+        return self
+
+    def build(self, filenames: list) -> None:
+        """
+        Describes files and writes the metadata file, keeping the entries of other files that are still up to date
+        PRE : filenames are names of CSV files contained in self.directory
+        POST : The metadata file contains an up to date entry for each file of filenames (it is only rewritten if an entry changed)
+        """
+        self.load()
+        files = {filename: entry for filename, entry in self.files.items() if self.is_current(filename)}
+        changed = len(files) != len(self.files)
+        for filename in filenames:
+            if filename not in files:
+                files[filename] = self.describe(filename)
+                changed = True
+        self.files = files
+        if changed:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as file:
+                json.dump({"files": self.files}, file)
+
+    @abstractmethod
+    def describe(self, filename: str) -> dict:
+        """
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns the entry of filename, containing at least its mtime (mtime_ns), size and header
+        """
+
+    def is_current(self, filename: str) -> bool:
+        """
+        PRE : None
+        POST : Returns True if filename has an entry matching its current mtime and size / False if not
+        """
+        entry = self.files.get(filename)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except OSError:
+            return False
+        return entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+
+    def clear(self) -> None:
+        """
+        PRE : None
+        POST : The metadata file does not exist (anymore)
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def parse_line(line: bytes) -> list:
+        """
+        PRE : line is a line of a CSV file
+        POST : Returns the list of the values of line
+        """
+        line = line.decode().rstrip("\r\n")
+        if '"' not in line:
+            # Without quotes, the CSV reader would only split on commas
+            return line.split(",") if line else []
+        return next(csv.reader([line]), [])
+
+    @staticmethod
+    def read_rows(directory: str, filename: str, header: list, spans: list, stats: dict=None):
+        """
+        PRE : spans is a list of (offset, rows) of filename, sorted by offset / stats is a dictionary with a "bytes" key or None
+        POST : Yields the [rows] rows starting at each offset, as dictionaries identical to the ones of csv.DictReader
+               stats["bytes"] (if given) is increased by the number of bytes read
+        """
+        with open(os.path.join(directory, filename), "rb") as file:
+            for offset, rows in spans:
+                file.seek(offset)
+                for _ in range(rows):
+                    line = file.readline()
+                    if stats is not None:
+                        stats["bytes"] += len(line)
+                    values = FileMetadata.parse_line(line)
+                    if not values:
+                        # csv.DictReader skips empty lines
+                        continue
+                    row = dict(zip(header, values))
+                    # Same handling of short and long rows as csv.DictReader
+                    if len(values) > len(header):
+                        row[None] = values[len(header):]
+                    for key in header[len(values):]:
+                        row[key] = None
+                    yield row
+
+class PerFileMetadata(FileMetadata):
+    """
+    Metadata stored per file in the directory [directory]/[PATH], [filename].json holding the entry of each CSV file
+    Entries are only read when needed (see self.entry), and only the entries of the files which changed are written again
+    """
+    def load(self):
+        """
+        PRE : None
+        POST : No entry is read yet, they are read per file when needed (see self.entry) / Returns self
+        """
+        self.files = {}
+        return self
+
+    def entry(self, filename: str):
+        """
+        PRE : None
+        POST : Returns the entry of filename, read from its metadata file if needed, or None if filename has no up to date entry
+        """
+        if filename not in self.files:
+            try:
+                with open(os.path.join(self.path, f"{filename}.json"), "r") as file:
+                    self.files[filename] = json.load(file)
+            except (OSError, ValueError):
+                return None
+        return self.files[filename] if self.is_current(filename) else None
+
+    def build(self, filenames: list) -> None:
+        """
+        PRE : filenames are names of CSV files contained in self.directory
+        POST : Each file of filenames has an up to date entry (only the files which changed are described again), entries of files which do not exist anymore are removed
+        """
+        os.makedirs(self.path, exist_ok=True)
+        for filename in filenames:
+            if self.entry(filename) is None:
+                self.write(filename, self.describe(filename))
+        for name in os.listdir(self.path):
+            filename = name.rpartition(".")[0]
+            if filename not in filenames and not os.path.exists(os.path.join(self.directory, filename)):
+                os.remove(os.path.join(self.path, name))
+
+    def write(self, filename: str, entry: dict) -> None:
+        """
+        PRE : entry is the result of self.describe(filename)
+        POST : The metadata file of filename contains entry, self.files[filename] is entry
+        """
+        with open(os.path.join(self.path, f"{filename}.json"), "w") as file:
+            json.dump(entry, file)
+        self.files[filename] = entry
+
+    def clear(self) -> None:
+        """
+        PRE : None
+        POST : The metadata directory does not exist (anymore)
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+class SecondaryIndex(PerFileMetadata):
+    """
+    Inverted indexes of the CSV files of a directory, stored per file in [directory]/.cache/index
+    For each file and each indexed column, the index maps every value to the byte offsets of the rows containing it
+    [filename].json holds the mtime, size and header of the file and, for each value, the position of its offsets in [filename].offsets (64 bits little endian integers)
+    Entries are only read when a filter can use them, and only the offsets of the filtered values are read
+    """
+    PATH = os.path.join(".cache", "index")
+    # Categorical columns used in equality filters (Product ID is unique, indexing it would not skip anything)
+    COLUMNS = ["Company", "Origin", "Category"]
+
+    def write(self, filename: str, entry: dict) -> None:
+        """
+        PRE : entry is the result of self.describe(filename)
+        POST : The metadata and offsets files of filename contain entry, self.files[filename] is its entry as read by self.entry
+        """
+        offsets = array("Q")
+        postings = {}
+        for column, values in entry["postings"].items():
+            postings[column] = {}
+            for value, positions in values.items():
+                postings[column][value] = [len(offsets), len(positions)]
+                offsets.extend(positions)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        with open(os.path.join(self.path, f"{filename}.offsets"), "wb") as file:
+            offsets.tofile(file)
+        entry = {"mtime_ns": entry["mtime_ns"], "size": entry["size"], "header": entry["header"], "postings": postings}
+        # Written last, an entry is never used with offsets of another version of the file
+        with open(os.path.join(self.path, f"{filename}.json"), "w") as file:
+            json.dump(entry, file)
+        self.files[filename] = entry
+
+    def describe(self, filename: str) -> dict:
+        """
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns the index entry of filename : its mtime, size, header and the byte offsets of each value of each indexed column
+        """
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            header = self.parse_line(file.readline())
+            positions = [(header.index(column), column) for column in self.COLUMNS if column in header]
+            postings = {column: {} for _, column in positions}
+            offset = file.tell()
+            for line in file:
+                values = self.parse_line(line)
+                for position, column in positions:
+                    if position < len(values):
+                        postings[column].setdefault(values[position], []).append(offset)
+                offset += len(line)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "header": header, "postings": postings}
+
+    def lookup(self, filename: str, filters: list):
+        """
+        PRE : filters contains (key, operator, value) tuples or is None
+        POST : Returns the sorted offsets of the rows of filename matching every equality filter on an indexed column (empty if none can match),
+               or None if the index cannot be used (no such filter, or no up to date entry for filename)
+        """
+        equalities = [(key, value) for key, op, value in filters or [] if op == "==" and key in self.COLUMNS]
+        if not equalities:
+            return None
+        entry = self.entry(filename)
+        if entry is None or any(key not in entry["postings"] for key, _ in equalities):
+            return None
+        offsets = None
+        try:
+            with open(os.path.join(self.path, f"{filename}.offsets"), "rb") as file:
+                for key, value in equalities:
+                    start, count = entry["postings"][key].get(value, (0, 0))
+                    matching = set(self.read_offsets(file, start, count))
+                    offsets = matching if offsets is None else offsets & matching
+        except OSError:
+            return None
+        return sorted(offsets)
+
+    @staticmethod
+    def read_offsets(file, start: int, count: int) -> array:
+        """
+        PRE : file is an offsets file opened in binary mode / (start, count) is the position of offsets in file
+        POST : Returns the [count] offsets starting at the [start]th one
+        """
+        offsets = array("Q")
+        if count:
+            file.seek(start * offsets.itemsize)
+            offsets.frombytes(file.read(count * offsets.itemsize))
+            if sys.byteorder == "big":
+                offsets.byteswap()
+        return offsets
+
+    def selection(self, filename: str, filters: list):
+        """
+        PRE : filters contains (key, operator, value) tuples or is None
+        POST : Returns (header, spans) where spans are the (offset, 1) of the rows given by self.lookup, or None if the index cannot be used
+        """
+        offsets = self.lookup(filename, filters)
+        if offsets is None:
+            return None
+        return self.files[filename]["header"], [(offset, 1) for offset in offsets]
+
+class ZoneMaps(FileMetadata):
+    """
+    Minimum and maximum of the numeric columns of the CSV files of a directory, stored in [directory]/.cache/zonemaps.json
+    They are kept for each file and for each block of BLOCK_ROWS rows, so that range filters skip the files and blocks which cannot match
+    """
+    PATH = os.path.join(".cache", "zonemaps.json")
+    COLUMNS = [column for column, column_type in COLUMN_TYPES.items() if is_numeric(column_type)]
+    BLOCK_ROWS = 1024
+
+    def describe(self, filename: str) -> dict:
+        """
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns the zone maps entry of filename : its mtime, size, header, the [min, max] of each numeric column and its blocks
+               Each block has its offset, end (byte offsets), number of lines (rows) and the [min, max] of each numeric column
+               A column containing a value which is not a number has no [min, max] (None), as it cannot be pruned
+        """
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        blocks = []
+        with open(path, "rb") as file:
+            header = self.parse_line(file.readline())
+            positions = [(header.index(column), column) for column in self.COLUMNS if column in header]
+            offset = file.tell()
+            block = None
+            for line in file:
+                if block is None:
+                    block = {"offset": offset, "end": offset, "rows": 0, "ranges": {column: [None, None] for _, column in positions}}
+                    blocks.append(block)
+                values = self.parse_line(line)
+                for position, column in positions:
+                    self.extend(block["ranges"], column, values[position] if position < len(values) else None)
+                offset += len(line)
+                block["end"] = offset
+                block["rows"] += 1
+                if block["rows"] == self.BLOCK_ROWS:
+                    block = None
+        ranges = {column: self.union([block["ranges"][column] for block in blocks]) for _, column in positions}
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "header": header, "ranges": ranges, "blocks": blocks}
+
+    @staticmethod
+    def extend(ranges: dict, column: str, value: str) -> None:
+        """
+        PRE : ranges[column] is a [min, max] list or None
+        POST : ranges[column] also covers value, or is None if value is not a number
+        """
+        bounds = ranges[column]
+        if bounds is None:
+            return
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            ranges[column] = None
+            return
+        if number != number:
+            # NaN cannot be ordered
+            ranges[column] = None
+            return
+        if bounds[0] is None or number < bounds[0]:
+            bounds[0] = number
+        if bounds[1] is None or number > bounds[1]:
+            bounds[1] = number
+
+    @staticmethod
+    def union(ranges: list):
+        """
+        PRE : ranges is a list of [min, max] lists or None
+        POST : Returns the [min, max] covering every range, or None if one of them is None
+        """
+        if any(bounds is None for bounds in ranges):
+            return None
+        lows = [bounds[0] for bounds in ranges if bounds[0] is not None]
+        highs = [bounds[1] for bounds in ranges if bounds[1] is not None]
+        return [min(lows) if lows else None, max(highs) if highs else None]
+
+    @staticmethod
+    def may_match(bounds, op: str, value: str) -> bool:
+        """
+        PRE : bounds is a [min, max] list or None
+        POST : Returns False if no number between min and max can match the filter (op, value) / True if not (or if it cannot be known)
+        """
+        if bounds is None:
+            return True
+        low, high = bounds
+        if low is None:
+            # No row at all
+            return False
+        try:
+            number = float(value)
+        except ValueError:
+            return True
+        if op == "<":
+            return low < number
+        if op == "<=":
+            return low <= number
+        if op == ">":
+            return high > number
+        if op == ">=":
+            return high >= number
+        if op == "==":
+            return low <= number <= high
+        return not low == high == number
+
+    def spans(self, filename: str, filters: list):
+        """
+        PRE : filters contains (key, operator, value) tuples or is None
+        POST : Returns the (offset, rows) of the blocks of filename which may match every filter on a numeric column (empty if the file cannot match),
+               or None if every row has to be read (no such filter, no block can be skipped or no up to date entry for filename)
+        """
+        ranges = [(key, op, value) for key, op, value in filters or [] if key in self.COLUMNS]
+        if not ranges or not self.is_current(filename):
+            return None
+        entry = self.files[filename]
+        if not all(self.may_match(entry["ranges"].get(key), op, value) for key, op, value in ranges):
+            return []
+        blocks = [block for block in entry["blocks"] if all(self.may_match(block["ranges"].get(key), op, value) for key, op, value in ranges)]
+        if len(blocks) == len(entry["blocks"]):
+            return None
+        return [(block["offset"], block["rows"]) for block in blocks]
+
+    def restrict(self, filename: str, spans: list, blocks: list) -> list:
+        """
+        PRE : spans are row spans of filename (see FileMetadata.read_rows) / blocks is the result of self.spans for filename
+        POST : Returns the spans of spans starting inside one of blocks
+        """
+        ends = {block["offset"]: block["end"] for block in self.files[filename]["blocks"]}
+        starts = [offset for offset, _ in blocks]
+        kept = []
+        for offset, rows in spans:
+            position = bisect.bisect_right(starts, offset) - 1
+            if position >= 0 and offset < ends[starts[position]]:
+                kept.append((offset, rows))
+        return kept
@@ -1,34 +1,91 @@
 import argparse
-from datagen import DataGen
-from fetcher import Fetcher
-from utils import Utils
+import os
+import shlex
+import sys
+# Run as a script, the modules are imported from the src package of the repository, as by the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import Utils
+from src.schema import COLUMNS_NAMES
 
 VALID_OPERATORS = ["==", "!=", "<", ">", "<=", ">="]
-COLUMNS_NAMES = ["Product ID", "Company", "Origin", "Category", "Stock", "Unit Price"]
 
 def main():
-    datagen, fetcher, utils = DataGen(), Fetcher(), Utils()
+    utils = Utils()
 
     parser = argparse.ArgumentParser(description="Manage and query product data")
+    parser.add_argument("-y", "--yes", action="store_true", help="Answer yes to every confirmation, to run without user input")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     generate_parser = subparsers.add_parser("generate", help="Generate JSON data files")
     generate_parser.add_argument("-f", "--files", type=int, default=10, help="Number of files (default: 10)")
     generate_parser.add_argument("-r", "--rows", type=int, default=200, help="Number of rows per file (default: 200)")
+    generate_parser.add_argument("-b", "--bulk", action="store_true", help="Generate rows in batches with NumPy, for large datasets (different data than the default mode)")
+    generate_parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes writing files with --bulk, 0 for one per core (default: 1)")
 
     subparsers.add_parser("delete", help="Delete all product data")
 
+    subparsers.add_parser("index", help="Build the indexes of Company, Origin and Category and the zone maps of Stock and Unit Price used by filters")
+
+    analytics_parser = subparsers.add_parser("analytics", help="Print the analytics of all data from summaries kept per file, only reading the files which changed")
+    analytics_parser.add_argument("-g", "--group-by", choices=["Company", "Origin", "Category"], help="Print the analytics of the rows of each value of this column instead")
+
     fetch_parser = subparsers.add_parser("fetch", help="Fetch and sort data")
-    fetch_parser.add_argument("-f", "--filter", action="append", nargs=3, metavar=("KEY", "OPERATOR", "VALUE"), help="Filter data by a specific key, logic operator and value")
-    fetch_parser.add_argument("-s", "--sort", choices=COLUMNS_NAMES, help="Field to sort data by")
-    fetch_parser.add_argument("-r", "--reverse", action="store_true", help="Sort data in descending order")
-    fetch_parser.add_argument("-c", "--column", action="append", choices=COLUMNS_NAMES, help="Columns to fetch, default: all")
+    add_query_arguments(fetch_parser)
+    add_scan_arguments(fetch_parser)
+    fetch_parser.add_argument("--no-result-cache", action="store_true", help="Always read the files instead of reusing the result of an identical query made since they last changed")
+    fetch_parser.add_argument("-e", "--engine", choices=["python", "numpy"], default="python", help="Evaluate the query row by row (python) or on whole columns (numpy, needs NumPy) (default: python)")
+    fetch_parser.add_argument("--server", metavar="HOST:PORT", help="Send the query to a running serve command instead of reading the files")
+    fetch_parser.add_argument("-g", "--group-by", choices=COLUMNS_NAMES, help="Print one row per value of this column with the aggregates of its rows (see --agg) instead of the rows")
+    fetch_parser.add_argument("-a", "--agg", action="append", metavar="FUNCTION(COLUMN)", help="Aggregate computed while scanning the files: count(*), count, sum, avg, min or max of a column, default: count(*). Argument cumulable")
+    fetch_parser.add_argument("--profile", action="store_true", help="Print the time spent in each stage of the query and in each file, the rows scanned and matched, the bytes read and the peak memory")
+    fetch_parser.add_argument("--profile-output", metavar="FILE", help="Write the profile (see --profile) to this file as JSON")
+
+    export_parser = subparsers.add_parser("export", help="Fetch data and write it to a file as it is read, without printing it")
+    add_query_arguments(export_parser)
+    add_scan_arguments(export_parser)
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "columnar"], default="jsonl", help="JSON Lines, CSV or a compact binary format storing rows by columns (default: jsonl)")
+    export_parser.add_argument("-z", "--compression", choices=["gzip", "bz2", "xz"], help="Compress the file as it is written, default: not compressed")
+    export_parser.add_argument("-o", "--output", help="Path of the file, default: output.<format> in the exports directory of the data directory")
+    export_parser.add_argument("-a", "--analytics", action="store_true", help="Include the analytics of the rows (in <output>.analytics.json for the CSV format)")
+
+    batch_parser = subparsers.add_parser("batch", help="Answer the fetch queries of a file with a single scan of the data")
+    batch_parser.add_argument("file", help="File containing one query per line, written with the arguments of fetch (lines starting with # are ignored)")
+    batch_parser.add_argument("-o", "--output", help="Directory the results of each query are exported to (query_1.jsonl, ...), default: not exported")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Always parse the CSV files instead of reading their columnar cache")
+    batch_parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes scanning files, 0 for one per core (default: 1)")
+    # Each line of a batch file only describes a query, the files are scanned once for all of them
+    line_parser = argparse.ArgumentParser(prog="batch line", description="Query of a line of a batch file")
+    add_query_arguments(line_parser)
+
+    serve_parser = subparsers.add_parser("serve", help="Keep the data in memory and answer fetch queries over HTTP (see fetch --server)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("-p", "--port", type=int, default=7170, help="Port to listen on (default: 7170)")
+    serve_parser.add_argument("-i", "--interval", type=float, default=1.0, help="Seconds between two checks of the data files, changed files are read again (default: 1)")
+    serve_parser.add_argument("--no-cache", action="store_true", help="Always parse the CSV files instead of reading their columnar cache")
 
     args = parser.parse_args()
+    Utils.assume_yes = args.yes
+
+    # Only the modules needed by the command are imported (Faker for generate, NumPy for the cache of fetch and batch)
+    if args.command in ("generate", "delete", "index", "analytics"):
+        from src.datagen import DataGen
+        datagen = DataGen()
+    else:
+        from src.fetcher import Fetcher
+        from src.columnar import ColumnarCache
+        from src.analytics import Analytics
+        fetcher = Fetcher()
 
     if args.command == "generate":
         if utils.validate_input(f"Do you want to generate {args.files} files of {args.rows} each ?"):
-            datagen.generate_data(args.files, args.rows)
+            if args.bulk:
+                from src.columnar import ColumnarCache
+                if not ColumnarCache.available():
+                    print("[t201-script] Bulk generation needs NumPy to be installed")
+                    return
+                datagen.generate_bulk(args.files, args.rows, args.jobs)
+            else:
+                datagen.generate_data(args.files, args.rows)
             print("[t201-script] Data generated successfully")
         else:
             print("[t201-script] Data generation aborted")
@@ -38,18 +95,56 @@ def main():
             datagen.delete_data()
             print("[t201-script] Data deleted successfully")
 
+    elif args.command == "index":
+        datagen.index_data()
+        print("[t201-script] Data indexed successfully")
+
+    elif args.command == "analytics":
+        from src.summaries import Summaries
+        summaries = Summaries(datagen.directory)
+        filenames = [filename for filename in os.listdir(datagen.directory) if filename.endswith(".csv")]
+        stale = summaries.stale(filenames)
+        try:
+            summaries.build(filenames)
+        except OSError as e:
+            print(f"[t201-script] Error processing summaries : {e}")
+            return
+        if args.group_by:
+            for value, group in summaries.groups(filenames, args.group_by).items():
+                print(f"[t201-script] {args.group_by} == {value}")
+                print(group.result())
+        else:
+            print(summaries.analytics(filenames).result())
+        print(f"[t201-script] Analytics of {len(filenames)} files ({len(stale)} read again)")
+
     elif args.command == "fetch":
-        filters = []
-        if args.filter:
-            for filter_args in args.filter:
-                key, op, value = filter_args
-                filters.append((key, op, value))
-        sort = args.sort
-        reverse = args.reverse
-        columns = [column for column in args.column] if args.column else None
+        fetcher.use_cache = not args.no_cache and ColumnarCache.available()
+        fetcher.use_index = not args.no_index
+        fetcher.use_results = not args.no_result_cache
+        if args.engine == "numpy" and not ColumnarCache.available():
+            print("[t201-script] The numpy engine needs NumPy to be installed")
+            return
+        query = query_from_args(args)
+        try:
+            fetcher.check_query(query)
+        except ValueError as e:
+            print(f"[t201-script] {e}")
+            return
+        filters, sort, reverse, columns = query["filters"], query["sort"], query["reverse"], query["columns"]
+        aggregated = args.group_by or args.agg
+        if aggregated and (args.server or args.engine == "numpy" or columns):
+            print("[t201-script] --group-by and --agg cannot be combined with --server, --engine numpy or --column")
+            return
+        if aggregated and sort and sort != args.group_by:
+            print("[t201-script] Aggregated rows can only be sorted by the grouped column")
+            return
 
         fetch_description = "[t201-script] Are you sure you want to fetch"
-        if columns:
+        if aggregated:
+            fetch_description += f" {', '.join(args.agg or ['count(*)'])}"
+            if args.group_by:
+                fetch_description += f" grouped by '{args.group_by}'"
+        elif columns:
             fetch_description += f" columns {', '.join(columns)}"
         else:
             fetch_description += " all columns"
@@ -58,26 +153,224 @@ def main():
             fetch_description += f" with filters ({filter_desc})"
         if sort:
             fetch_description += f" sorted by '{sort}'"
-            fetch_description += f" in {"descending" if reverse else "ascending"} order"
+            fetch_description += f" in {'descending' if reverse else 'ascending'} order"
+        if args.limit:
+            fetch_description += f" limited to {args.limit} {'groups' if aggregated else 'rows'}"
         fetch_description += " ?"
 
         if not utils.validate_input(fetch_description):
             print("[t201-script] Data fetching aborted")
             return
-        data = fetcher.fetch_data(filters, sort, reverse, columns)
-        for row in data:
-            print(row)
-        analytics = fetcher.get_analytics(data)
+        if args.profile or args.profile_output:
+            from src.profiler import Profiler
+            fetcher.profiler = Profiler()
+        if aggregated:
+            try:
+                # Only the groups are kept in memory, not the rows
+                groups = fetcher.aggregate(filters, args.group_by, args.agg, args.jobs).result()
+            except ValueError as e:
+                print(f"[t201-script] {e}")
+                return
+            if sort:
+                groups = list(fetcher.sort_data(groups, sort, reverse, args.limit))
+            elif args.limit:
+                groups = groups[:args.limit]
+            for _ in fetcher.timed("print", print_rows(groups)):
+                pass
+            print(f"[t201-script] {len(groups)} groups aggregated")
+            report_profile(fetcher.profiler, args.profile, args.profile_output)
+            return
+        # Rows are printed, analysed and exported in a single pass, so the export choice is made beforehand
+        export = utils.validate_input("Do you wish to export this data ?")
+        include_analytics = export and utils.validate_input("Do you want to include analytics ?")
+        try:
+            if args.server:
+                from src.server import QueryClient
+                try:
+                    with fetcher.stage("server"):
+                        data, analytics = QueryClient(args.server).fetch(query)
+                except OSError as e:
+                    print(f"[t201-script] Could not reach the server {args.server} : {e}")
+                    return
+            elif args.engine == "numpy":
+                from src.vectorized import NumpyEngine
+                engine = NumpyEngine(fetcher)
+                with fetcher.stage("numpy"):
+                    table = engine.query(filters, sort, reverse, columns, args.limit)
+                data = engine.rows(table)
+            else:
+                # Rows are only kept in memory (or spilled to disk past --memory-limit) when sorting
+                # Analytics are computed while scanning the files
+                accumulator = Analytics()
+                data = fetcher.query(filters, sort, reverse, columns, args.jobs, args.limit, args.memory_limit, accumulator)
+            if export:
+                data = fetcher.timed("export", fetcher.export_lines(data))
+            for _ in fetcher.timed("print", print_rows(data)):
+                pass
+            if not args.server:
+                # The server answers with the analytics of the rows
+                analytics = engine.get_analytics(table) if args.engine == "numpy" else accumulator.result()
+        except ValueError as e:
+            print(f"[t201-script] {e}")
+            return
+        except OSError as e:
+            # Temporary files of the sort, export file...
+            print(f"[t201-script] Data fetching failed : {e}")
+            return
         print(analytics)
+        if fetcher.pruned_files or fetcher.pruned_blocks:
+            print(f"[t201-script] Skipped {fetcher.pruned_files} files and {fetcher.pruned_blocks} blocks of rows which could not match the filters")
+        report_profile(fetcher.profiler, args.profile, args.profile_output)
         print("[t201-script] Data fetched successfully")
-        if not utils.validate_input("Do you wish to export this data ?"):
+        if not export:
             print("[t201-script] Data was not exported")
             return
-        if not utils.validate_input("Do you want to include analytics ?"):
-            content = [data]
-        else:
-            content = [data, analytics]
-        fetcher.export_data(content)
+        if include_analytics:
+            fetcher.export_analytics(analytics)
+        print("[t201-script] Data exported to output.jsonl")
+
+    elif args.command == "export":
+        from src.exporter import Exporter
+        fetcher.use_cache = not args.no_cache and ColumnarCache.available()
+        fetcher.use_index = not args.no_index
+        query = query_from_args(args)
+        try:
+            fetcher.check_query(query)
+        except ValueError as e:
+            print(f"[t201-script] {e}")
+            return
+        # CSV exports are kept out of the data directory, they would be read as data files
+        path = args.output or os.path.join(fetcher.directory, "exports", Exporter.default_path(args.format, args.compression))
+        if not utils.validate_input(f"Do you want to export the fetched data to {path} ?"):
+            print("[t201-script] Data export aborted")
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            accumulator = Analytics() if args.analytics else None
+            data = fetcher.query(query["filters"], query["sort"], query["reverse"], query["columns"], args.jobs, args.limit, args.memory_limit, accumulator)
+            count = Exporter(path, args.format, args.compression).write(data, accumulator)
+        except ValueError as e:
+            print(f"[t201-script] {e}")
+            return
+        except OSError as e:
+            print(f"[t201-script] Error processing file {path} : {e}")
+            return
+        print(f"[t201-script] {count} rows exported to {path}")
+
+    elif args.command == "batch":
+        fetcher.use_cache = not args.no_cache and ColumnarCache.available()
+        try:
+            with open(args.file, "r") as file:
+                lines = [(number, line.strip()) for number, line in enumerate(file, 1) if line.strip() and not line.strip().startswith("#")]
+        except OSError as e:
+            print(f"[t201-script] Error processing file {args.file} : {e}")
+            return
+        queries = []
+        for number, line in lines:
+            try:
+                query = query_from_args(line_parser.parse_args(shlex.split(line)))
+                fetcher.check_query(query)
+            except SystemExit:
+                print(f"[t201-script] Invalid query on line {number} : {line}")
+                return
+            except ValueError as e:
+                print(f"[t201-script] Invalid query on line {number} : {line} ({e})")
+                return
+            queries.append(query)
+        if not utils.validate_input(f"Do you want to run the {len(queries)} queries of {args.file} ?"):
+            print("[t201-script] Data fetching aborted")
+            return
+        try:
+            answers = fetcher.fetch_many(queries, args.jobs)
+        except ValueError as e:
+            print(f"[t201-script] {e}")
+            return
+        for position, ((number, line), (rows, analytics)) in enumerate(zip(lines, answers), 1):
+            print(f"[t201-script] Query {position} (line {number}) : {line}")
+            for row in rows:
+                print(row)
+            print(analytics)
+            if args.output:
+                os.makedirs(args.output, exist_ok=True)
+                path = os.path.abspath(os.path.join(args.output, f"query_{position}.jsonl"))
+                for _ in fetcher.export_lines(rows, path):
+                    pass
+                fetcher.export_analytics(analytics, path)
+        print(f"[t201-script] {len(queries)} queries answered with a single scan of the data")
+
+    elif args.command == "serve":
+        import asyncio
+        from src.server import QueryServer
+        fetcher.use_cache = not args.no_cache and ColumnarCache.available()
+        try:
+            asyncio.run(QueryServer(fetcher, args.interval).serve(args.host, args.port))
+        except OSError as e:
+            print(f"[t201-script] Could not listen on {args.host}:{args.port} : {e}")
+
+def add_query_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    PRE : parser is the parser of a command fetching data
+    POST : parser accepts the arguments describing the query (the ones of a line of a batch file)
+    """
+    parser.add_argument("-f", "--filter", action="append", nargs=3, metavar=("KEY", "OPERATOR", "VALUE"), help="Filter data by a specific key, logic operator and value")
+    parser.add_argument("-s", "--sort", choices=COLUMNS_NAMES, help="Field to sort data by")
+    parser.add_argument("-r", "--reverse", action="store_true", help="Sort data in descending order")
+    parser.add_argument("-c", "--column", action="append", choices=COLUMNS_NAMES, help="Columns to fetch, default: all")
+    parser.add_argument("-l", "--limit", type=int, help="Maximum number of rows to fetch (with --sort, the first ones in sort order)")
+
+def add_scan_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    PRE : parser is the parser of a command fetching data
+    POST : parser accepts the arguments describing how the files are scanned
+    """
+    parser.add_argument("-m", "--memory-limit", type=float, help="Memory budget in MB when sorting, sorted runs exceeding it are spilled to disk")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the CSV files instead of reading their columnar cache")
+    parser.add_argument("--no-index", action="store_true", help="Always scan every row instead of using the indexes and zone maps to skip rows")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes scanning files, 0 for one per core (default: 1)")
+
+def query_from_args(args) -> dict:
+    """
+    PRE : args are the parsed arguments of the fetch command
+    POST : Returns the query they describe, as expected by Fetcher.fetch_many
+    """
+    return {
+        "filters": [(key, op, value) for key, op, value in args.filter or []],
+        "sort": args.sort,
+        "reverse": args.reverse,
+        "columns": list(args.column) if args.column else None,
+        "limit": args.limit
+    }
+
+def report_profile(profiler, summary: bool, path: str=None) -> None:
+    """
+    PRE : profiler is the Profiler of a fetch, or None if it was not profiled
+    POST : Prints the summary of the profile if summary, writes it as JSON to path if given
+    """
+    if profiler is None:
+        return
+    import json
+    from src.profiler import Profiler
+    profile = profiler.result()
+    if summary:
+        print(Profiler.summary(profile))
+    if path:
+        try:
+            with open(path, "w") as file:
+                json.dump(profile, file, indent=4)
+        except OSError as e:
+            print(f"[t201-script] Error processing file {path} : {e}")
+            return
+        print(f"[t201-script] Profile written to {path}")
+
+def print_rows(rows):
+    """
+    Prints each row while passing it through
+    PRE : rows is an iterable
+    POST : Yields each item of rows after printing it
+    """
+    for row in rows:
+        print(row)
+        yield row
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,208 @@
+import io
+import sys
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is then unknown
+    resource = None
+
+class Profiler:
+    """
+    Time spent in each stage of a query, and what was read from each file
+    Stages are blocks run in self.stage or iterators wrapped by self.timed : the time spent producing an item counts towards the stage producing it,
+    the stages it consumes from being subtracted, so that the seconds of the stages add up to the time of the query
+    """
+    def __init__(self):
+        """
+        PRE : None
+        POST : Nothing is recorded yet, the total time starts now
+               self.stages maps each stage to [seconds, items produced] / self.files maps each file to its seconds, rows_scanned, rows_matched and bytes
+        """
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.files = {}
+        # [start, seconds of the nested stages] of each stage being run
+        self.stack = []
+
+    def enter(self) -> None:
+        """
+        PRE : None
+        POST : A stage starts, nested in the stage being run if any
+        """
+        self.stack.append([time.perf_counter(), 0.0])
+
+    def leave(self, name: str, items: int=0) -> float:
+        """
+        PRE : self.enter was called for this stage
+        POST : The time since self.enter, less the time of its nested stages, and items are accounted for in stage name / Returns the time since self.enter
+        """
+        start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        stage = self.stages.setdefault(name, [0.0, 0])
+        stage[0] += elapsed - nested
+        stage[1] += items
+        if self.stack:
+            self.stack[-1][1] += elapsed
+        return elapsed
+
+    @contextmanager
+    def stage(self, name: str, stats: dict=None, seconds: str=None):
+        """
+        PRE : stats is the result of self.file or None, seconds is a key of stats or None
+        POST : The time spent in the block is accounted for in stage name, and in stats[seconds] if given (nested stages included)
+        """
+        self.enter()
+        try:
+            yield
+        finally:
+            elapsed = self.leave(name)
+            if seconds:
+                stats[seconds] += elapsed
+
+    def timed(self, name: str, rows, stats: dict=None, count: str=None, seconds: str=None):
+        """
+        PRE : rows is an iterable / stats is the result of self.file or None, count and seconds are keys of stats or None
+        POST : Yields each item of rows. The time spent producing them is accounted for in stage name, with the number of items
+               stats[count] (if given) is increased by the number of items, stats[seconds] (if given) by the time spent producing them, nested stages included
+        """
+        iterator = iter(rows)
+        while True:
+            produced = 0
+            self.enter()
+            try:
+                item = next(iterator)
+                produced = 1
+            except StopIteration:
+                return
+            finally:
+                elapsed = self.leave(name, produced)
+                if count:
+                    stats[count] += produced
+                if seconds:
+                    stats[seconds] += elapsed
+            yield item
+
+    def file(self, filename: str) -> dict:
+        """
+        PRE : None
+        POST : Returns the statistics of filename, created empty if needed
+        """
+        stats = self.files.get(filename)
+        if stats is None:
+            stats = self.files[filename] = {"seconds": 0.0, "rows_scanned": 0, "rows_matched": 0, "bytes": 0}
+        return stats
+
+    @staticmethod
+    def open(path: str, stats: dict):
+        """
+        PRE : path is a text file / stats is the result of Profiler.file
+        POST : Returns path opened for reading as text, stats["bytes"] being increased by the bytes read from the disk
+        """
+        return io.TextIOWrapper(io.BufferedReader(CountingReader(io.FileIO(path, "r"), stats)))
+
+    def merge(self, other) -> None:
+        """
+        PRE : other is a Profiler whose stages were run by a worker process
+        POST : The stages and files account for the ones of other as well (the seconds of the workers are then added up, they may exceed the time of the query)
+        """
+        for name, (seconds, items) in other.stages.items():
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += seconds
+            stage[1] += items
+        for filename, other_stats in other.files.items():
+            stats = self.file(filename)
+            for key, value in other_stats.items():
+                stats[key] += value
+
+    @staticmethod
+    def peak_memory() -> dict:
+        """
+        PRE : None
+        POST : Returns the peak resident memory in bytes of this process and of its largest finished worker process, None if unknown
+        """
+        if resource is None:
+            return {"process": None, "workers": None}
+        # ru_maxrss is in kilobytes, except on macOS
+        unit = 1 if sys.platform == "darwin" else 1024
+        return {
+            "process": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+        }
+
+    def result(self) -> dict:
+        """
+        PRE : None
+        POST : Returns the profile as a JSON compatible dictionary : the time since the profiler was created, the seconds and items produced of each stage,
+               the statistics of each file and their totals, and the peak memory
+        """
+        files = self.files.values()
+        return {
+            "seconds": time.perf_counter() - self.start,
+            "stages": {name: {"seconds": seconds, "items": items} for name, (seconds, items) in self.stages.items()},
+            "files": self.files,
+            "rows_scanned": sum(stats["rows_scanned"] for stats in files),
+            "rows_matched": sum(stats["rows_matched"] for stats in files),
+            "bytes": sum(stats["bytes"] for stats in files),
+            "peak_memory": self.peak_memory()
+        }
+
+    @staticmethod
+    def summary(profile: dict, slowest: int=5) -> str:
+        """
+        PRE : profile is the result of Profiler.result / slowest >= 0
+        POST : Returns a readable summary of profile : totals, the stages by decreasing time, then the [slowest] slowest files
+        """
+        megabytes = lambda size: "unknown" if size is None else f"{size / 2 ** 20:.1f} MB"
+        memory = profile["peak_memory"]
+        lines = [
+            f"[t201-script] Profile : {profile['seconds']:.3f} s, {profile['rows_scanned']} rows scanned, {profile['rows_matched']} matched, {megabytes(profile['bytes'])} read",
+            f"[t201-script] Peak memory : {megabytes(memory['process'])} (workers : {megabytes(memory['workers'])})"
+        ]
+        total = profile["seconds"] or 1
+        for name, stage in sorted(profile["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"    {name:<10} {stage['seconds']:9.3f} s {100 * stage['seconds'] / total:6.1f} % {stage['items']:>10} items")
+        files = sorted(profile["files"].items(), key=lambda item: -item[1]["seconds"])[:slowest]
+        if files:
+            lines.append("[t201-script] Slowest files :")
+        for filename, stats in files:
+            matched = f"{100 * stats['rows_matched'] / stats['rows_scanned']:.1f} %" if stats["rows_scanned"] else "-"
+            lines.append(f"    {filename} : {stats['seconds']:.3f} s, {stats['rows_scanned']} rows scanned, {stats['rows_matched']} matched ({matched}), {megabytes(stats['bytes'])}")
+        return "\n".join(lines)
+
+class CountingReader(io.RawIOBase):
+    """
+    Binary file counting the bytes read from it
+    """
+    def __init__(self, file: io.FileIO, stats: dict):
+        """
+        PRE : file is opened for reading / stats is a dictionary with a "bytes" key
+        POST : Reads file, adding the number of bytes read to stats["bytes"]
+        """
+        self.file = file
+        self.stats = stats
+
+    def readable(self) -> bool:
+        """
+        PRE : None
+        POST : Returns True, the file is read
+        """
+        return True
+
+    def readinto(self, buffer) -> int:
+        """
+        PRE : buffer is a writable bytes-like object
+        POST : Reads bytes of the file into buffer, counting them / Returns their number (0 at the end of the file)
+        """
+        size = self.file.readinto(buffer)
+        self.stats["bytes"] += size or 0
+        return size
+
+    def close(self) -> None:
+        """
+        PRE : None
+        POST : The file is closed
+        """
+        self.file.close()
+        super().close()
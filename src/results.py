@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+class ResultCache:
+    """
+    Results of earlier fetches, stored in [directory]/.cache/results with one JSON file per query
+    A result is found by a key made of the normalized query and the name, size and mtime of every data file, so that it is never used once a file changed
+    The least recently used results are removed once the results take more than max_bytes, results larger than max_result_bytes are not cached
+    """
+    DIRECTORY = os.path.join(".cache", "results")
+    MAX_BYTES = 64 * 2 ** 20
+    # Rows are kept in memory until they are cached, only small results are worth it
+    MAX_RESULT_BYTES = 4 * 2 ** 20
+
+    def __init__(self, directory: str, max_bytes: int=MAX_BYTES, max_result_bytes: int=MAX_RESULT_BYTES):
+        """
+        PRE : directory contains the CSV files the results were fetched from / max_bytes >= max_result_bytes > 0
+        POST : self.directory is directory / self.cache_directory is the directory holding the results, which take at most max_bytes, and at most max_result_bytes each
+        """
+        self.directory = directory
+        self.cache_directory = os.path.join(directory, self.DIRECTORY)
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+
+    def key(self, query: dict, filenames: list) -> str:
+        """
+        PRE : query is a dictionary whose keys are arguments of Fetcher.fetch_data (filters, sort, reverse, columns, limit), all optional
+              filenames are the names of the files the query reads, in the order they are read
+        POST : Returns the key of the result of query on the current content of the files. Queries differing only by the order of their filters share the same key
+        """
+        fingerprint = []
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            fingerprint.append([filename, stat.st_size, stat.st_mtime_ns])
+        sort = query.get("sort")
+        normalized = {
+            # Filters are all applied, their order does not change the result
+            "filters": sorted([str(key), str(op), str(value)] for key, op, value in query.get("filters") or []),
+            "sort": sort,
+            "reverse": bool(query.get("reverse")) if sort else False,
+            # The order of the columns is the order of the keys of the rows
+            "columns": list(query.get("columns") or []) or None,
+            "limit": query.get("limit"),
+            "files": fingerprint
+        }
+        return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        PRE : key is the result of self.key
+        POST : Returns (rows, analytics) as given to self.put for key, or None if the result is not cached. The result becomes the most recently used
+        """
+        path = os.path.join(self.cache_directory, f"{key}.json")
+        try:
+            with open(path, "r") as file:
+                result = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result["rows"], result["analytics"]
+
+    def put(self, key: str, rows: list, analytics: dict=None) -> bool:
+        """
+        PRE : key is the result of self.key / rows is the list of rows fetched for key / analytics is the state of their Analytics (see Analytics.to_dict) or None
+        POST : Same as self.put_encoded
+        """
+        return self.put_encoded(key, [json.dumps(row) for row in rows], analytics)
+
+    def put_encoded(self, key: str, rows: list, analytics: dict=None) -> bool:
+        """
+        PRE : same as self.put, rows being encoded by json.dumps
+        POST : The result is cached, then the least recently used results are removed until they take at most self.max_bytes
+               Returns True if the result is cached / False if it takes more than self.max_result_bytes or could not be written
+        """
+        payload = f'{{"rows": [{", ".join(rows)}], "analytics": {json.dumps(analytics)}}}'.encode()
+        if len(payload) > self.max_result_bytes:
+            return False
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            # Written aside then renamed, a result being read is never partially written
+            descriptor, temporary = tempfile.mkstemp(dir=self.cache_directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(payload)
+            os.replace(temporary, os.path.join(self.cache_directory, f"{key}.json"))
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """
+        PRE : None
+        POST : The least recently used results are removed until the results take at most self.max_bytes
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.cache_directory) if entry.name.endswith(".json")]
+            entries = sorted(((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in entries), reverse=True)
+        except OSError:
+            return
+        total = 0
+        for _, size, path in entries:
+            total += size
+            if total > self.max_bytes:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """
+        PRE : None
+        POST : self.cache_directory does not exist (anymore)
+        """
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
@@ -0,0 +1,101 @@
+import operator
+
+COLUMNS_NAMES = ["Product ID", "Company", "Origin", "Category", "Stock", "Unit Price"]
+
+# Type of the values of each column, as written by DataGen.generate_data
+COLUMN_TYPES = {
+    "Product ID": str,
+    "Company": str,
+    "Origin": str,
+    "Category": str,
+    "Stock": int,
+    "Unit Price": float
+}
+
+def is_numeric(column_type: type) -> bool:
+    """
+    PRE : None
+    POST : Returns True if column_type describes numeric values (int or float) / False if not
+    """
+    return column_type in (int, float)
+
+class Record:
+    """
+    Compact row of a data file : one slot per column of COLUMNS_NAMES instead of a dictionary, numeric columns parsed once (see COLUMN_TYPES)
+    A number is only stored as such if it is written back as the same string, so that a record converts back to the exact row it was read from
+    Reads like a dictionary mapping column names to values (numbers for numeric columns) : record[column], record.get(column), record.items()
+    """
+    __slots__ = ("product_id", "company", "origin", "category", "stock", "unit_price")
+    ATTRIBUTES = dict(zip(COLUMNS_NAMES, __slots__))
+    VALUES = operator.attrgetter(*__slots__)
+
+    def __init__(self, product_id: str, company: str, origin: str, category: str, stock, unit_price):
+        """
+        PRE : stock and unit_price are parsed by parse (numbers, or strings which are not written back the same)
+        POST : The record holds the values
+        """
+        self.product_id = product_id
+        self.company = company
+        self.origin = origin
+        self.category = category
+        self.stock = stock
+        self.unit_price = unit_price
+
+    @classmethod
+    def from_row(cls, row: dict):
+        """
+        PRE : row is a dictionary mapping column names to string values (as read by csv.DictReader)
+        POST : Returns the record of row, or None if its columns are not exactly COLUMNS_NAMES in order
+        """
+        if list(row) != COLUMNS_NAMES:
+            return None
+        product_id, company, origin, category, stock, unit_price = row.values()
+        return cls(product_id, company, origin, category, parse(stock, int), parse(unit_price, float))
+
+    def __getitem__(self, column: str):
+        return getattr(self, self.ATTRIBUTES[column])
+
+    def get(self, column: str, default=None):
+        attribute = self.ATTRIBUTES.get(column)
+        return default if attribute is None else getattr(self, attribute)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.ATTRIBUTES
+
+    def __iter__(self):
+        return iter(COLUMNS_NAMES)
+
+    def __len__(self) -> int:
+        return len(COLUMNS_NAMES)
+
+    def keys(self) -> list:
+        return COLUMNS_NAMES
+
+    def items(self):
+        return zip(COLUMNS_NAMES, self.VALUES(self))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Record) and self.VALUES(self) == self.VALUES(other)
+
+    def __repr__(self) -> str:
+        return f"Record({self.to_dict()!r})"
+
+    def to_dict(self, columns: list=None) -> dict:
+        """
+        PRE : columns are column names of COLUMNS_NAMES or None
+        POST : Returns the row the record was read from, restricted to columns if given
+        """
+        return {column: str(getattr(self, self.ATTRIBUTES[column])) for column in columns or COLUMNS_NAMES}
+
+def parse(value: str, column_type: type):
+    """
+    PRE : column_type is a type of COLUMN_TYPES
+    POST : Returns value as a column_type if it is written back as value by str, value itself if not
+    """
+    if column_type is str or value is None:
+        return value
+    try:
+        number = column_type(value)
+    except (ValueError, OverflowError):
+        return value
+    return number if str(number) == value else value
@@ -0,0 +1,195 @@
+import asyncio
+import http.client
+import json
+import os
+from http import HTTPStatus
+from itertools import chain, islice
+from src.fetcher import Fetcher
+from src.schema import Record
+
+class QueryServer:
+    """
+    Answers fetch queries over HTTP from the rows of the data files, read once and kept in memory as compact records (see Record)
+    A file is only read again when the watcher sees it changed (mtime or size), files added or removed are picked up the same way
+    """
+    def __init__(self, fetcher: Fetcher, interval: float=1.0):
+        """
+        PRE : fetcher.directory exists / interval > 0
+        POST : self.files maps each file name to ((mtime_ns, size), rows), empty until self.refresh (rows are Record, or dictionaries for files with other columns) / the directory is checked every [interval] seconds while serving
+        """
+        self.fetcher = fetcher
+        self.interval = interval
+        self.files = {}
+
+    def refresh(self) -> bool:
+        """
+        PRE : self.fetcher.directory exists
+        POST : self.files contains the rows of each CSV file of the directory, in the order of Fetcher.list_files. Only new or changed files are read
+               Returns True if a file was read or removed / False if nothing changed
+        """
+        files = {}
+        changed = False
+        for filename in self.fetcher.list_files():
+            try:
+                stat = os.stat(os.path.join(self.fetcher.directory, filename))
+            except OSError:
+                # Removed since it was listed
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            entry = self.files.get(filename)
+            if entry is None or entry[0] != signature:
+                entry = signature, [Record.from_row(row) or row for row in self.fetcher.iter_file(filename, None, lambda row: True)]
+                changed = True
+            files[filename] = entry
+        changed = changed or files.keys() != self.files.keys()
+        # Replaced at once, queries being answered keep the rows they started with
+        self.files = files
+        return changed
+
+    def answer(self, query: dict) -> dict:
+        """
+        PRE : query is a dictionary whose keys are arguments of Fetcher.fetch_data (filters, sort, reverse, columns, limit), all optional
+        POST : Returns {"rows": rows, "analytics": analytics} : the rows Fetcher.fetch_data returns for query, and their Fetcher.get_analytics
+        RAISES : ValueError if the query is invalid (see Fetcher.check_query)
+        """
+        if not isinstance(query, dict):
+            raise ValueError("A query must be a JSON object")
+        Fetcher.check_query(query)
+        predicate = Fetcher.compile_filters(query.get("filters"))
+        record_predicate = Fetcher.compile_record_filters(query.get("filters"))
+        columns = query.get("columns")
+        # Records are filtered on their parsed values, then converted back to rows as fetched from the files
+        rows = (row for _, rows in self.files.values() for row in rows if (record_predicate if row.__class__ is Record else predicate)(row))
+        limit, sort = query.get("limit"), query.get("sort")
+        if sort:
+            rows = self.fetcher.sort_data(rows, sort, query.get("reverse", False), limit)
+        elif limit:
+            rows = islice(rows, limit)
+        # Only the answered rows are converted
+        rows = [self.to_row(row, columns) for row in rows]
+        return {"rows": rows, "analytics": Fetcher.get_analytics(rows)}
+
+    @staticmethod
+    def to_row(row, columns: list) -> dict:
+        """
+        PRE : row is a Record or a dictionary / columns are keys of row or None
+        POST : Returns the dictionary of strings Fetcher.fetch_data returns for row, restricted to columns if given
+        """
+        if isinstance(row, Record):
+            return row.to_dict(columns)
+        return {key: row[key] for key in columns} if columns else row
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        """
+        PRE : method, path and body are those of an HTTP request
+        POST : Returns (status, content) : POST /fetch answers the JSON query of body (see self.answer), GET /status describes the data in memory
+        """
+        if method == "GET" and path == "/status":
+            files = self.files
+            return 200, {"files": len(files), "rows": sum(len(rows) for _, rows in files.values())}
+        if method == "POST" and path == "/fetch":
+            try:
+                query = json.loads(body or b"{}")
+                # Answered in a thread, the server keeps accepting other clients meanwhile
+                content = await asyncio.get_running_loop().run_in_executor(None, self.answer, query)
+            except (ValueError, TypeError, KeyError) as e:
+                return 400, {"error": str(e)}
+            return 200, content
+        return 404, {"error": f"Unknown endpoint {method} {path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        PRE : reader and writer are the streams of a client connection
+        POST : One HTTP request was read and answered with a JSON body, the connection is closed
+        """
+        try:
+            method, path, _ = (await reader.readline()).decode().split(" ", 2)
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length) if length else b""
+            status, content = await self.route(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, content = 400, {"error": "Malformed HTTP request"}
+        payload = json.dumps(content).encode()
+        head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+        try:
+            writer.write(head.encode() + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def watch(self) -> None:
+        """
+        PRE : None
+        POST : Refreshes self.files every [self.interval] seconds, until cancelled
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if await loop.run_in_executor(None, self.refresh):
+                print(f"[t201-script] Data reloaded : {len(self.files)} files")
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        """
+        PRE : port is a free TCP port of host, or 0 to pick one
+        POST : self.files is up to date / Returns the asyncio server accepting HTTP clients on host:port (without watching the directory)
+        """
+        self.refresh()
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve(self, host: str, port: int) -> None:
+        """
+        PRE : same as self.start
+        POST : Answers queries and watches the directory until cancelled
+        """
+        server = await self.start(host, port)
+        watcher = asyncio.create_task(self.watch())
+        address, port = server.sockets[0].getsockname()[:2]
+        rows = sum(len(rows) for _, rows in self.files.values())
+        print(f"[t201-script] Serving {rows} rows of {len(self.files)} files on http://{address}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+class QueryClient:
+    """
+    Sends fetch queries to a QueryServer
+    """
+    def __init__(self, address: str, timeout: float=60):
+        """
+        PRE : address is host:port of a QueryServer
+        POST : Queries are sent to address, waiting at most [timeout] seconds for an answer
+        RAISES : ValueError if address is not host:port
+        """
+        host, _, port = address.rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid server address: {address} (expected HOST:PORT)")
+        self.host, self.port, self.timeout = host, int(port), timeout
+
+    def fetch(self, query: dict) -> tuple:
+        """
+        PRE : query is a dictionary as expected by QueryServer.answer
+        POST : Returns (rows, analytics) as answered by the server, equal to Fetcher.fetch_data and Fetcher.get_analytics
+        RAISES : ValueError if the server rejects the query / OSError if it cannot be reached
+        """
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request("POST", "/fetch", json.dumps(query), {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            content = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise ValueError(content.get("error", f"Server answered {response.status}"))
+        numeric_stats, categorical_counts = content["analytics"]
+        return content["rows"], (numeric_stats, categorical_counts)
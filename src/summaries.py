@@ -0,0 +1,79 @@
+import csv
+import os
+from src.analytics import Analytics
+from src.indexes import PerFileMetadata, SecondaryIndex, ZoneMaps
+
+class Summaries(PerFileMetadata):
+    """
+    Analytics of each CSV file of a directory, stored per file in [directory]/.cache/summaries
+    They are merged to answer the analytics of every row, or of the rows of each value of a categorical column, only reading and writing the summaries of the files which changed
+    """
+    PATH = os.path.join(".cache", "summaries")
+    # Columns whose value is unique to each row : counting their values would make a summary as large as its file
+    UNIQUE = ["Product ID"]
+    # Columns the analytics can be grouped by
+    GROUPS = SecondaryIndex.COLUMNS
+    # Columns analysed for each group
+    GROUPED = GROUPS + ZoneMaps.COLUMNS
+
+    def describe(self, filename: str) -> dict:
+        """
+        PRE : filename is the name of a CSV file contained in self.directory
+        POST : Returns the summary of filename : its mtime, size, header, the Analytics of its rows without the self.UNIQUE columns (analytics),
+               and for each column of self.GROUPS, the Analytics of the self.GROUPED columns of the rows of each of its values (groups)
+        """
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        analytics = Analytics()
+        groups = {column: {} for column in self.GROUPS}
+        with open(path, "r") as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                analytics.add({key: value for key, value in row.items() if key not in self.UNIQUE})
+                grouped = {key: row[key] for key in self.GROUPED if key in row}
+                for column in self.GROUPS:
+                    if column in row:
+                        group = groups[column].get(row[column])
+                        if group is None:
+                            group = groups[column][row[column]] = Analytics()
+                        group.add(grouped)
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "header": reader.fieldnames or [],
+            "analytics": analytics.to_dict(),
+            "groups": {column: {value: group.to_dict() for value, group in values.items()} for column, values in groups.items()}
+        }
+
+    def stale(self, filenames: list) -> list:
+        """
+        PRE : filenames are names of CSV files contained in self.directory
+        POST : Returns the files of filenames whose summary is missing or out of date, which self.build would read
+        """
+        self.load()
+        return [filename for filename in filenames if self.entry(filename) is None]
+
+    def analytics(self, filenames: list) -> Analytics:
+        """
+        PRE : each file of filenames has an up to date summary (see self.build)
+        POST : Returns the Analytics of every row of filenames without the self.UNIQUE columns, merged in their order (as a scan of the files by several jobs would)
+        """
+        analytics = Analytics()
+        for filename in filenames:
+            analytics.merge(Analytics.from_dict(self.entry(filename)["analytics"]))
+        return analytics
+
+    def groups(self, filenames: list, column: str) -> dict:
+        """
+        PRE : each file of filenames has an up to date summary (see self.build) / column is contained in self.GROUPS
+        POST : Returns a dictionary mapping each value of column to the Analytics of the self.GROUPED columns of its rows, in order of first appearance
+        """
+        groups = {}
+        for filename in filenames:
+            for value, data in self.entry(filename)["groups"].get(column, {}).items():
+                group = groups.get(value)
+                if group is None:
+                    groups[value] = Analytics.from_dict(data)
+                else:
+                    group.merge(Analytics.from_dict(data))
+        return groups
@@ -1,11 +1,18 @@
 class Utils:
+    # Set by the --yes option, every confirmation is then answered automatically
+    assume_yes = False
+
     @staticmethod
     def validate_input(message: str) -> bool:
         """
         Asks for the user to confirm their input
         PRE : None
         POST : Returns True if the user inputs y/Y / False if the user inputs n/N / stays in the loop otherwise
+               Returns True without asking if Utils.assume_yes
         """
+        if Utils.assume_yes:
+            print(f"[t201-script] {message} [y/n]y")
+            return True
         input_upper = input(f"[t201-script] {message} [y/n]").upper()
         while input_upper not in ("Y", "N"):
             input_upper = input(f"[t201-script] Invalid option. {message} [y/n]").upper()
@@ -0,0 +1,157 @@
+import numpy as np
+from src.analytics import Analytics
+from src.columnar import ColumnarCache, Column
+from src.fetcher import Fetcher
+from src.schema import COLUMN_TYPES, is_numeric
+
+class NumpyEngine:
+    """
+    Query engine evaluating fetches on whole columns with NumPy instead of row by row
+    Rows are identical to the ones of Fetcher.fetch_data, and so are the counts, totals, minimums, maximums and categorical counts of the analytics
+    The mean and the variance are equal up to rounding, and the quartiles are approximate : they depend on the order the values are added in,
+    which is the order of the rows of the table (sorted or not), while main.py accumulates them in the order the files are read (by one or several jobs)
+    A table is a dictionary mapping each fetched column name to a Column, all of the same length
+    """
+    def __init__(self, fetcher: Fetcher):
+        """
+        PRE : fetcher is a Fetcher, NumPy is installed
+        POST : self.fetcher is fetcher, its directory and its use_cache setting are used to read the files
+        """
+        self.fetcher = fetcher
+
+    def query(self, filters: list=None, sort: str=None, reverse: bool=False, columns: list=None, limit: int=None) -> dict:
+        """
+        Vectorized counterpart of Fetcher.fetch_data
+        PRE : same as Fetcher.fetch_data
+        POST : Returns a table containing the rows Fetcher.fetch_data would return, in the same order
+        RAISES : ValueError if a filter is invalid (before any file is opened), or if files do not share the same columns
+        """
+        Fetcher.compile_filters(filters)
+        tables = [self.scan_file(filename, filters, columns) for filename in self.fetcher.list_files()]
+        tables = [table for table in tables if table is not None]
+        if not tables:
+            return {}
+        names = list(tables[0])
+        if any(list(table) != names for table in tables):
+            raise ValueError("The NumPy engine needs files sharing the same columns")
+        table = {name: Column.concatenate([table[name] for table in tables]) for name in names}
+        length = len(table[names[0]]) if names else 0
+        if sort and length:
+            order = self.sort_order(table[sort], sort, reverse)
+        else:
+            order = np.arange(length)
+        if limit:
+            order = order[:limit]
+        return {name: column.take(order) for name, column in table.items()}
+
+    def scan_file(self, filename: str, filters: list, columns: list):
+        """
+        PRE : filename is the name of a file contained in self.fetcher.directory
+        POST : Returns a table of the rows of filename matching filters, restricted to columns / None if the file could not be read
+        """
+        cache = ColumnarCache(self.fetcher.directory)
+        try:
+            loaded = cache.load(filename) if self.fetcher.use_cache else cache.parse(filename)
+        except Exception as e:
+            print(f"Error processing file {filename} : {e}")
+            return None
+        keys = [key for key, _, _ in filters or []] + (columns or [])
+        if loaded is None or any(key not in loaded[0] for key in keys):
+            # Irregular files are read row by row, as Fetcher does
+            return self.table_from_rows(list(self.fetcher.iter_file(filename, columns, Fetcher.compile_filters(filters))))
+        header, file_columns = loaded
+        file_columns = dict(zip(header, file_columns))
+        mask = np.ones(len(file_columns[header[0]]), dtype=bool)
+        for key, op, value in filters or []:
+            mask &= self.filter_mask(file_columns[key], key, op, value)
+        indices = np.flatnonzero(mask)
+        return {name: file_columns[name].take(indices) for name in columns or header}
+
+    @staticmethod
+    def table_from_rows(rows: list):
+        """
+        PRE : rows is a list of dictionaries sharing the same keys
+        POST : Returns a table containing rows / None if rows is empty
+        """
+        if not rows:
+            return None
+        return {name: Column.encode([row[name] for row in rows], ColumnarCache.DICTIONARY_RATIO) for name in rows[0]}
+
+    @staticmethod
+    def filter_mask(column: Column, key: str, op: str, value: str):
+        """
+        PRE : column contains the values of the key column / op is contained in Fetcher.OPERATORS
+        POST : Returns a boolean array, True for each value of column matching the filter as Fetcher.compile_filter would
+        """
+        op_func = Fetcher.OPERATORS[op]
+        numeric = is_numeric(COLUMN_TYPES.get(key) or Fetcher.get_column_type(value))
+        if numeric and column.kind in ("int", "float"):
+            return np.asarray(op_func(column.array, float(value)))
+        if not numeric and column.kind == "text":
+            return np.asarray(op_func(column.array, value))
+        # Other cases evaluate the row filter once per distinct value
+        predicate = Fetcher.compile_filter(key, op, value)
+        if column.kind == "dictionary":
+            lookup = np.array([predicate({key: item}) for item in column.values], dtype=bool)
+            return lookup[column.array]
+        distinct, inverse = np.unique(column.array, return_inverse=True)
+        lookup = np.array([predicate({key: str(item)}) for item in distinct.tolist()], dtype=bool)
+        return lookup[inverse.reshape(-1)]
+
+    @staticmethod
+    def sort_order(column: Column, sort: str, reverse: bool):
+        """
+        PRE : column contains the values of the sort column, it is not empty
+        POST : Returns the positions of the values of column in the order of Fetcher.sort_data (stable, in both directions)
+        """
+        sample = column.strings(0, 1)[0]
+        numeric = is_numeric(COLUMN_TYPES.get(sort) or Fetcher.get_column_type(sample))
+        if column.kind in ("int", "float"):
+            keys = column.array.astype(float) if numeric else np.array(column.strings(), dtype=str)
+        elif column.kind == "dictionary":
+            # Dictionaries are sorted, codes are ordered as the strings they stand for
+            keys = np.array(column.values, dtype=float)[column.array] if numeric else column.array
+        else:
+            keys = column.array.astype(float) if numeric else column.array
+        if not reverse:
+            return np.argsort(keys, kind="stable")
+        # Stable descending order : sort the reversed keys, then map positions back
+        return len(keys) - 1 - np.argsort(keys[::-1], kind="stable")[::-1]
+
+    @staticmethod
+    def rows(table: dict, batch_size: int=4096):
+        """
+        PRE : table is the result of self.query
+        POST : Yields each row of table as a dictionary of strings, as Fetcher.fetch_data returns them
+        """
+        yield from ColumnarCache.rows(list(table), list(table.values()), batch_size)
+
+    @staticmethod
+    def get_analytics(table: dict) -> tuple:
+        """
+        Vectorized counterpart of Fetcher.get_analytics
+        PRE : table is the result of self.query
+        POST : Returns the same (numeric_stats, categorical_counts) as Fetcher.get_analytics(list(self.rows(table))), the mean and the variance up to rounding
+        """
+        analytics = Analytics()
+        for name, column in table.items():
+            if not len(column):
+                continue
+            text = COLUMN_TYPES.get(name) is str
+            if column.kind in ("int", "float") and not text:
+                analytics.numeric_accumulator(name).add_array(column.array.astype(float))
+                continue
+            if column.kind == "dictionary":
+                distinct, codes = column.values, column.array
+            else:
+                distinct, codes = np.unique(column.array, return_inverse=True)
+                distinct, codes = [str(value) for value in distinct.tolist()], codes.reshape(-1)
+            if not text and any(Fetcher.get_column_type(value) is float for value in distinct):
+                # Columns mixing numbers and text are analysed row by row
+                analytics.update({name: value} for value in column.strings())
+                continue
+            counts = np.bincount(codes, minlength=len(distinct))
+            used, first_positions = np.unique(codes, return_index=True)
+            # Values are listed in order of first appearance, as the row by row count does
+            analytics.add_counts(name, {distinct[code]: int(counts[code]) for code in used[np.argsort(first_positions)].tolist()})
+        return analytics.result()
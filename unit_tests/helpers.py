@@ -0,0 +1,57 @@
+import os
+import tempfile
+from src.fetcher import Fetcher
+
+def sample_value(i, j):
+    """
+    Returns the number of row j of the test file i : values repeat across files, so that filters and sorts match rows of several files
+    """
+    return (i * 7 + j * 3) % 40
+
+class DataDirectory:
+    """
+    Mixin of test cases reading CSV files written in a temporary directory (self.tmp), removed after each test
+    self.fetcher reads the files of that directory
+    """
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.fetcher = Fetcher()
+        self.fetcher.directory = self.tmp.name
+
+    def write(self, filename, header, rows):
+        """
+        Writes filename with the header line, then each line of rows
+        """
+        with open(os.path.join(self.tmp.name, filename), 'w') as f:
+            f.write(header + '\n' + '\n'.join(rows))
+
+    def append(self, filename, row):
+        """
+        Adds the line row at the end of filename
+        """
+        with open(os.path.join(self.tmp.name, filename), 'a') as f:
+            f.write('\n' + row)
+
+    def write_files(self, count, header, row, rows=20):
+        """
+        Writes test0.csv to test[count - 1].csv, line j of file i being row(i, j) / Returns their names
+        """
+        filenames = [f'test{i}.csv' for i in range(count)]
+        for i, filename in enumerate(filenames):
+            self.write(filename, header, (row(i, j) for j in range(rows)))
+        return filenames
+
+def assert_same_analytics(test, result, expected):
+    """
+    Checks that two results of Analytics.result are equal, the mean and the variance up to rounding (they depend on the order values are added and merged in)
+    """
+    test.assertEqual(result[1], expected[1])
+    test.assertEqual(result[0].keys(), expected[0].keys())
+    for column, stats in expected[0].items():
+        for name in ('count', 'min', 'max', 'quantiles'):
+            test.assertEqual(result[0][column][name], stats[name])
+        test.assertAlmostEqual(result[0][column]['total'], stats['total'])
+        test.assertAlmostEqual(result[0][column]['mean'], stats['mean'])
+        test.assertAlmostEqual(result[0][column]['variance'], stats['variance'])
@@ -0,0 +1,43 @@
+import unittest
+from src.aggregation import Aggregation
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            {'Category': 'Tool', 'Stock': '10', 'Unit Price': '2.5'},
+            {'Category': 'Food', 'Stock': '4', 'Unit Price': 'n/a'},
+            {'Category': 'Tool', 'Stock': '6', 'Unit Price': '1.5'},
+            {'Category': 'Food', 'Stock': '', 'Unit Price': '3'}
+        ]
+
+    def test_group_by(self):
+        aggregation = Aggregation('Category', ['count(*)', 'count(Stock)', 'sum(Stock)', 'avg(Unit Price)', 'min(Stock)', 'max(Unit Price)'])
+        aggregation.update(self.rows)
+        self.assertEqual(aggregation.result(), [
+            {'Category': 'Tool', 'count(*)': 2, 'count(Stock)': 2, 'sum(Stock)': 16.0, 'avg(Unit Price)': 2.0, 'min(Stock)': 6.0, 'max(Unit Price)': 2.5},
+            {'Category': 'Food', 'count(*)': 2, 'count(Stock)': 1, 'sum(Stock)': 4.0, 'avg(Unit Price)': 3.0, 'min(Stock)': 4.0, 'max(Unit Price)': 3.0}
+        ])
+
+    def test_single_group_and_empty_values(self):
+        aggregation = Aggregation(aggregates=['SUM( Stock )', 'avg(Missing)'])
+        aggregation.update(self.rows)
+        self.assertEqual(aggregation.result(), [{'sum(Stock)': 20.0, 'avg(Missing)': None}])
+        self.assertEqual(Aggregation().result(), [])
+
+    def test_merge_equals_single_pass(self):
+        aggregates = ['count(*)', 'sum(Stock)', 'min(Unit Price)', 'max(Stock)']
+        expected = Aggregation('Category', aggregates)
+        expected.update(self.rows)
+        first, second = Aggregation('Category', aggregates), Aggregation('Category', aggregates)
+        first.update(self.rows[:1])
+        second.update(self.rows[1:])
+        first.merge(second)
+        self.assertEqual(first.result(), expected.result())
+
+    def test_invalid_aggregates(self):
+        for aggregate in ('median(Stock)', 'sum(*)', 'sum', 'count()'):
+            with self.assertRaises(ValueError):
+                Aggregation('Category', [aggregate])
+
+if __name__ == '__main__':
+    unittest.main()
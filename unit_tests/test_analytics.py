@@ -0,0 +1,74 @@
+import json
+import random
+import unittest
+from src.analytics import Analytics, NumericAccumulator, QuantileSketch
+from helpers import assert_same_analytics
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            {'Company': '123', 'age': '25', 'score': '85.5', 'name': 'Alice'},
+            {'Company': 'Acme', 'age': '30', 'score': 'n/a', 'name': 'Bob'},
+            {'Company': 'Acme', 'age': '22', 'score': '78.1', 'name': 'Alice'}
+        ]
+
+    def test_schema_driven_columns(self):
+        analytics = Analytics()
+        analytics.update(self.rows)
+        numeric_stats, categorical_counts = analytics.result()
+        # Company is declared as text, even numbers are counted
+        self.assertEqual(categorical_counts['Company'], {'123': 1, 'Acme': 2})
+        self.assertEqual(categorical_counts['score'], {'n/a': 1})
+        self.assertEqual(numeric_stats['score']['count'], 2)
+        self.assertEqual(numeric_stats['age']['total'], 77)
+        self.assertAlmostEqual(numeric_stats['age']['variance'], 10.888888, places=4)
+        self.assertEqual(numeric_stats['age']['quantiles']['0.5'], 25)
+
+    def test_merge_equals_single_pass(self):
+        single = Analytics()
+        single.update(self.rows)
+        first, second = Analytics(), Analytics()
+        first.update(self.rows[:1])
+        second.update(self.rows[1:])
+        first.merge(second)
+        assert_same_analytics(self, first.result(), single.result())
+
+    def test_numeric_accumulator_merge(self):
+        random.seed(717)
+        values = [random.uniform(0, 100) for _ in range(5000)]
+        whole, left, right = NumericAccumulator(), NumericAccumulator(), NumericAccumulator()
+        for value in values:
+            whole.add(value)
+        for value in values[:1234]:
+            left.add(value)
+        for value in values[1234:]:
+            right.add(value)
+        left.merge(right)
+        self.assertEqual(left.count, whole.count)
+        self.assertAlmostEqual(left.total, whole.total, places=6)
+        self.assertEqual((left.min, left.max), (whole.min, whole.max))
+
+    def test_quantile_sketch(self):
+        sketch = QuantileSketch()
+        for value in range(10000):
+            sketch.add(value)
+        # Approximate once more than CAPACITY values were added
+        self.assertLess(abs(sketch.quantile(0.5) - 5000), 250)
+        self.assertLess(abs(sketch.quantile(0.25) - 2500), 250)
+        exact = QuantileSketch()
+        exact.add_many([3, 1, 2])
+        self.assertEqual(exact.quantile(0.5), 2)
+
+    def test_to_dict_round_trip(self):
+        analytics = Analytics()
+        analytics.update({'Stock': str(value), 'Category': 'Tool'} for value in random.Random(3).choices(range(1000), k=700))
+        state = json.loads(json.dumps(analytics.to_dict()))
+        restored = Analytics.from_dict(state)
+        self.assertEqual(restored.result(), analytics.result())
+        # The restored analytics keep accumulating like the original
+        for target in (analytics, restored):
+            target.add({'Stock': '5', 'Category': 'Food'})
+        self.assertEqual(restored.result(), analytics.result())
+
+if __name__ == '__main__':
+    unittest.main()
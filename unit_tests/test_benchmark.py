@@ -0,0 +1,48 @@
+import importlib.util
+import unittest
+
+class TestImportTime(unittest.TestCase):
+    def test_parse_importtime(self):
+        from src.benchmark import Benchmark
+        report = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |   _io",
+            "import time:       250 |        350 | io",
+            "import time:      1000 |       1000 |     faker.config",
+            "import time:       500 |       1500 |   faker",
+            "import time:       200 |       1700 | datagen",
+            "[t201-script] Data indexed successfully"
+        ])
+        imports = Benchmark.parse_importtime(report)
+        self.assertEqual(set(imports), {"io", "datagen"})
+        self.assertAlmostEqual(imports["datagen"], 0.0017)
+
+@unittest.skipUnless(importlib.util.find_spec("faker"), "Faker is needed to generate datasets")
+class TestBenchmark(unittest.TestCase):
+    def test_run_and_compare(self):
+        from src.benchmark import Benchmark
+        benchmark = Benchmark(repeat=1)
+        benchmark.SCALES = {"tiny": (2, 20)}
+        results = benchmark.run(["tiny"])
+        stages = results["scales"]["tiny"]
+        for stage in ("generate", "scan", "filter", "sort", "analytics", "export"):
+            self.assertGreaterEqual(stages[stage]["seconds"], 0)
+        self.assertGreater(stages["scan"]["peak_bytes"], 0)
+        lines = Benchmark.compare(results, results)
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all(line.endswith("1.00x") for line in lines))
+
+    def test_startup(self):
+        from src.benchmark import Benchmark
+        benchmark = Benchmark(repeat=1)
+        benchmark.SCALES = {"small": (1, 10)}
+        benchmark.STARTUP = {"help": ["--help"], "index": ["index"]}
+        results = benchmark.startup()
+        self.assertEqual(set(results), {"help", "index"})
+        self.assertGreater(results["index"]["seconds"], 0)
+        self.assertLessEqual(len(results["index"]["slowest_imports"]), 5)
+        lines = Benchmark.compare({"scales": {}, "startup": results}, {"scales": {}, "startup": results})
+        self.assertEqual(len(lines), 2)
+
+if __name__ == '__main__':
+    unittest.main()
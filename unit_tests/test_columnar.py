@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from src.columnar import ColumnarCache
+from src.fetcher import Fetcher
+
+@unittest.skipUnless(ColumnarCache.available(), "NumPy is not installed")
+class TestColumnarCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.csv')
+        with open(self.path, 'w') as f:
+            f.write('id,name,age,score,price\n' + '\n'.join(f'ID-{i},{"AB"[i % 2]},{i},{i / 4},{i}.50' for i in range(50)))
+        self.cache = ColumnarCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rows_are_identical_to_csv(self):
+        fetcher = Fetcher()
+        fetcher.directory = self.tmp.name
+        expected = fetcher.fetch_data()
+        fetcher.use_cache = True
+        self.assertEqual(fetcher.fetch_data(), expected)
+        # Second fetch is read from the cache
+        self.assertEqual(fetcher.fetch_data(), expected)
+
+    def test_column_encoding(self):
+        header, columns = self.cache.load('test.csv')
+        self.assertEqual(header, ['id', 'name', 'age', 'score', 'price'])
+        self.assertEqual([column.kind for column in columns], ['text', 'dictionary', 'int', 'float', 'text'])
+        self.assertEqual(columns[1].values, ['A', 'B'])
+
+    def test_cache_is_invalidated_when_file_changes(self):
+        self.cache.load('test.csv')
+        stat = os.stat(self.path)
+        self.assertIsNotNone(self.cache.read('test.csv', stat))
+        with open(self.path, 'a') as f:
+            f.write('\nID-50,A,50,12.5,50.50')
+        stat = os.stat(self.path)
+        self.assertIsNone(self.cache.read('test.csv', stat))
+        header, columns = self.cache.load('test.csv')
+        self.assertEqual(len(columns[0].array), 51)
+
+if __name__ == '__main__':
+    unittest.main()
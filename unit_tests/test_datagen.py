@@ -1,5 +1,7 @@
+import importlib.util
 import os
 import random
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock, call
 
@@ -53,5 +55,55 @@ class TestDeleteData(unittest.TestCase):
         mock_listdir.assert_called_once_with(self.test_directory)
         mock_remove.assert_not_called()
 
+@unittest.skipUnless(importlib.util.find_spec("faker"), "Faker is needed")
+class TestLazyPools(unittest.TestCase):
+    @patch("os.makedirs")
+    def test_pools_loaded_on_first_use(self, mock_makedirs):
+        from src.datagen import DataGen
+        datagen = DataGen()
+        self.assertIsNone(datagen._fake)
+        suppliers = datagen.suppliers
+        self.assertIsNotNone(datagen._fake)
+        self.assertEqual(len(suppliers), 30)
+        self.assertEqual((len(datagen.origins), len(datagen.categories)), (50, 50))
+        # Seeded with 717 on first use, a new DataGen draws the same pools
+        self.assertEqual(DataGen().suppliers, suppliers)
+
+    def test_directory_is_created_where_given(self):
+        from src.datagen import DataGen
+        with tempfile.TemporaryDirectory() as tmp, patch("os.path.expanduser") as mock_expanduser:
+            directory = os.path.join(tmp, "data")
+            self.assertEqual(DataGen(directory).directory, directory)
+            self.assertTrue(os.path.isdir(directory))
+            mock_expanduser.assert_not_called()
+
+@unittest.skipUnless(importlib.util.find_spec("faker") and importlib.util.find_spec("numpy"), "Faker and NumPy are needed")
+class TestBulkGeneration(unittest.TestCase):
+    def setUp(self):
+        from src.datagen import DataGen
+        self.write_bulk_file = DataGen.write_bulk_file
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.tmp.name, name)) as f:
+            return f.read()
+
+    def test_bulk_file_is_deterministic(self):
+        pools = (["Acme", "Globex"], ["Belgium", "France"], ["Tool", "Food"])
+        self.assertIsNone(self.write_bulk_file(self.tmp.name, "Alpha", 25, 0, *pools, batch_size=7))
+        first = self.read("Alpha.csv")
+        self.write_bulk_file(self.tmp.name, "Alpha", 25, 0, *pools)
+        # Same content whatever the batch size
+        self.assertEqual(self.read("Alpha.csv"), first)
+        lines = first.split("\n")
+        self.assertEqual(lines[0], "Product ID,Company,Origin,Category,Stock,Unit Price")
+        self.assertEqual(len(lines), 26)
+        self.assertTrue(lines[25].startswith("ALP-025,"))
+        self.write_bulk_file(self.tmp.name, "Alpha", 25, 1, *pools)
+        self.assertNotEqual(self.read("Alpha.csv"), first)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+from src.analytics import Analytics
+from src.exporter import Exporter
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rows = [
+            {'Product ID': f'P-{i:03}', 'Company': ['Acme', 'Globex, Inc'][i % 2], 'Stock': str(i * 7 % 50), 'Unit Price': str(i / 4), 'Note': f'é{i}' * (i % 3)}
+            for i in range(25)
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        for format in Exporter.FORMATS:
+            for compression in [None] + list(Exporter.COMPRESSIONS):
+                with self.subTest(format=format, compression=compression):
+                    exporter = Exporter(os.path.join(self.tmp.name, Exporter.default_path(format, compression)), format, compression)
+                    analytics = Analytics()
+                    self.assertEqual(exporter.write(analytics.accumulate(iter(self.rows)), analytics), len(self.rows))
+                    self.assertEqual(list(exporter.read()), self.rows)
+                    self.assertEqual(exporter.read_analytics(), json.loads(json.dumps(analytics.result())))
+
+    def test_columnar_row_groups(self):
+        exporter = Exporter(os.path.join(self.tmp.name, 'rows.t201c'), 'columnar')
+        exporter.GROUP_ROWS = 4
+        rows = self.rows + [{'Product ID': 'X', 'Company': None, 'Stock': '007', 'Unit Price': '1e3', 'Note': ''}]
+        self.assertEqual(exporter.write(iter(rows)), len(rows))
+        self.assertEqual(list(exporter.read()), rows)
+        self.assertIsNone(exporter.read_analytics())
+        # The header is written even without rows
+        exporter.write(iter([]))
+        self.assertEqual(list(exporter.read()), [])
+
+    def test_encode(self):
+        self.assertEqual(Exporter.encode(['1', '22', '-3'])[0], Exporter.INT)
+        self.assertEqual(Exporter.encode(['1.5', '22.25'])[0], Exporter.FLOAT)
+        # Strings which would not read back the same stay strings
+        self.assertEqual(Exporter.encode(['01', '2'])[0], Exporter.TEXT)
+        self.assertEqual(Exporter.encode(['a', 'b', 'a', 'a'])[0], Exporter.DICTIONARY)
+        for values in (['01', '2'], ['a', None, 'a', 'a'], ['1.50', '2']):
+            self.assertEqual(Exporter.decode(*Exporter.encode(values)), values)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Exporter('out', 'parquet')
+        with self.assertRaises(ValueError):
+            Exporter('out', 'csv', 'zip')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,12 @@
+import json
+import os
 import unittest
 from unittest.mock import patch, mock_open
+from src.analytics import Analytics
 from src.fetcher import Fetcher
+from src.profiler import Profiler
+from src.results import ResultCache
+from helpers import DataDirectory, assert_same_analytics, sample_value
 
 class TestFetcherWithMocks(unittest.TestCase):
     def setUp(self):
@@ -67,6 +73,37 @@ class TestFetcherWithMocks(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.fetcher.row_matches_filters(row, [('age', '===', '25')])
 
+    def test_compile_filters(self):
+        predicate = Fetcher.compile_filters([('Stock', '>=', '100'), ('Company', '<', 'F')])
+        self.assertTrue(predicate({'Stock': '100', 'Company': 'Apple'}))
+        self.assertFalse(predicate({'Stock': '99.5', 'Company': 'Apple'}))
+        self.assertFalse(predicate({'Stock': '500', 'Company': 'Google'}))
+        self.assertTrue(Fetcher.compile_filters(None)({}))
+        with self.assertRaises(ValueError):
+            Fetcher.compile_filters([('Stock', '>', 'many')])
+
+    def test_compile_record_filters(self):
+        from src.schema import Record
+        rows = [
+            {'Product ID': f'P-{i}', 'Company': ['Acme', 'Globex'][i % 2], 'Origin': 'Belgium', 'Category': 'Tool', 'Stock': str(i * 9 % 40), 'Unit Price': str(i / 2)}
+            for i in range(30)
+        ] + [{'Product ID': 'X', 'Company': 'Acme', 'Origin': 'Belgium', 'Category': 'Tool', 'Stock': '007', 'Unit Price': 'n/a'}]
+        records = [Record.from_row(row) for row in rows]
+        for filters in ([('Stock', '>', '10')], [('Unit Price', '<=', '7'), ('Company', '==', 'Acme')], [('Stock', '!=', '7')], None):
+            expected = [row for row in rows if self.fetcher.compile_filters(filters)(row)]
+            predicate = self.fetcher.compile_record_filters(filters)
+            self.assertEqual([record.to_dict() for record in records if predicate(record)], expected)
+        with self.assertRaises(ValueError):
+            self.fetcher.compile_record_filters([('Stock', '>', 'many')])
+
+    @patch('os.listdir')
+    @patch('builtins.open', new_callable=mock_open, read_data='name,age\nAlice,25')
+    def test_fetch_data_invalid_operator_fails_early(self, mock_file, mock_listdir):
+        mock_listdir.return_value = ['test1.csv']
+        with self.assertRaises(ValueError):
+            self.fetcher.fetch_data([('age', '=>', '25')])
+        mock_file.assert_not_called()
+
     def test_get_analytics(self):
         sample_data = [
             {'name': 'Alice', 'age': '25', 'score': '85.5'},
@@ -98,5 +135,163 @@ class TestFetcherWithMocks(unittest.TestCase):
             self.assertEqual(len(result), 1)
             self.assertEqual(result[0]['name'], 'Alice')
 
+class TestFetcherOnDisk(DataDirectory, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_files(4, 'name,age', lambda i, j: f'P{i}-{j},{sample_value(i, j)}')
+
+    def test_parallel_fetch_matches_sequential(self):
+        filters = [('age', '>=', '10')]
+        expected = self.fetcher.fetch_data(filters, 'age', True, None)
+        result = self.fetcher.fetch_data(filters, 'age', True, None, jobs=2)
+        self.assertEqual(result, expected)
+        self.assertEqual(self.fetcher.fetch_data(jobs=0), self.fetcher.fetch_data())
+
+    @patch.object(Fetcher, 'MIN_RUN_ROWS', 1)
+    def test_external_sort_matches_in_memory_sort(self):
+        for reverse in (False, True):
+            expected = self.fetcher.fetch_data(sort='age', reverse=reverse)
+            result = list(self.fetcher.query(sort='age', reverse=reverse, memory_limit=0.001))
+            self.assertEqual(result, expected)
+
+    @patch.object(Fetcher, 'MIN_RUN_ROWS', 3)
+    @patch.object(Fetcher, 'MERGE_FAN_IN', 2)
+    def test_external_sort_merges_in_passes(self):
+        expected = self.fetcher.fetch_data(sort='age')
+        with patch.object(Fetcher, 'merge_runs', wraps=Fetcher.merge_runs) as merge_runs:
+            self.assertEqual(list(self.fetcher.query(sort='age', memory_limit=0.0001)), expected)
+        # 26 runs of 3 rows, merged by pairs until at most 2 remain
+        self.assertGreater(merge_runs.call_count, 13)
+        self.assertTrue(all(len(call.args[1]) <= 2 for call in merge_runs.call_args_list))
+
+    def test_sort_with_limit(self):
+        expected = self.fetcher.fetch_data(sort='age', reverse=True)[:5]
+        self.assertEqual(self.fetcher.fetch_data(sort='age', reverse=True, limit=5), expected)
+        self.assertEqual(len(self.fetcher.fetch_data(limit=3)), 3)
+
+    def test_analytics_fused_into_scan(self):
+        expected = Fetcher.get_analytics(self.fetcher.fetch_data([('age', '>', '12')]))
+        for jobs in (1, 2):
+            analytics = Analytics()
+            rows = list(self.fetcher.query([('age', '>', '12')], sort='age', jobs=jobs, analytics=analytics))
+            numeric_stats, categorical_counts = analytics.result()
+            self.assertEqual(numeric_stats['age']['count'], len(rows))
+            self.assertAlmostEqual(numeric_stats['age']['mean'], expected[0]['age']['mean'])
+            self.assertEqual(categorical_counts, expected[1])
+
+    def test_iter_data_streams_same_rows(self):
+        rows = self.fetcher.iter_data([('age', '<', '5')], ['name'])
+        self.assertFalse(isinstance(rows, list))
+        self.assertEqual(list(rows), self.fetcher.fetch_data([('age', '<', '5')], columns=['name']))
+
+    def test_export_lines(self):
+        rows = list(self.fetcher.export_lines(self.fetcher.iter_data()))
+        self.fetcher.export_analytics(Fetcher.get_analytics(rows))
+        with open(os.path.join(self.tmp.name, 'output.jsonl')) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[:-1], rows)
+        self.assertEqual(lines[-1]['analytics'][0]['age']['count'], 80)
+        # The export is not read back as data
+        self.assertEqual(len(self.fetcher.fetch_data()), 80)
+
+    def test_aggregate_matches_rows(self):
+        filters = [('age', '>', '5')]
+        rows = self.fetcher.fetch_data(filters)
+        for jobs in (1, 2):
+            groups = self.fetcher.aggregate(filters, 'name', ['count(*)', 'sum(age)'], jobs).result()
+            self.assertEqual(len(groups), len(rows))
+            self.assertEqual(sum(group['sum(age)'] for group in groups), sum(float(row['age']) for row in rows))
+            total = self.fetcher.aggregate(filters, None, ['count(*)', 'max(age)'], jobs).result()
+            self.assertEqual(total, [{'count(*)': len(rows), 'max(age)': max(float(row['age']) for row in rows)}])
+        with self.assertRaises(ValueError):
+            self.fetcher.aggregate(filters, 'name', ['total(age)'])
+
+    def test_profiled_fetch_matches_fetch(self):
+        filters = [('age', '>', '20')]
+        expected = self.fetcher.fetch_data(filters, 'age')
+        for jobs in (1, 2):
+            self.fetcher.profiler = Profiler()
+            self.assertEqual(self.fetcher.fetch_data(filters, 'age', jobs=jobs), expected)
+            profile = self.fetcher.profiler.result()
+            self.assertEqual(profile['rows_scanned'], 80)
+            self.assertEqual(profile['rows_matched'], len(expected))
+            self.assertEqual(sorted(profile['files']), [f'test{i}.csv' for i in range(4)])
+            self.assertEqual(profile['bytes'], sum(os.path.getsize(os.path.join(self.tmp.name, f'test{i}.csv')) for i in range(4)))
+            self.assertEqual(profile['stages']['filter']['items'], len(expected))
+            self.assertEqual(profile['stages']['sort']['items'], len(expected))
+        self.fetcher.profiler = Profiler()
+        groups = self.fetcher.aggregate(filters, None, ['count(*)']).result()
+        self.assertEqual(groups, [{'count(*)': len(expected)}])
+        self.assertIn('aggregate', self.fetcher.profiler.result()['stages'])
+
+    def test_result_cache(self):
+        filters = [('age', '>', '20')]
+        expected = self.fetcher.fetch_data(filters, 'age', True, ['name', 'age'])
+        analytics = Analytics()
+        expected_analytics = Fetcher.get_analytics(expected)
+        self.fetcher.use_results = True
+        self.assertEqual(list(self.fetcher.query(filters, 'age', True, ['name', 'age'], analytics=analytics)), expected)
+        assert_same_analytics(self, analytics.result(), expected_analytics)
+        # Answered from the cache, without reading the files
+        with patch.object(Fetcher, 'iter_data', side_effect=AssertionError):
+            analytics = Analytics()
+            self.assertEqual(list(self.fetcher.query(filters, 'age', True, ['name', 'age'], analytics=analytics)), expected)
+            assert_same_analytics(self, analytics.result(), expected_analytics)
+            self.assertEqual(self.fetcher.fetch_data(filters, 'age', True, ['name', 'age']), expected)
+        # A changed file is read again
+        self.append('test0.csv', 'P0-new,39')
+        result = self.fetcher.fetch_data(filters, 'age', True, ['name', 'age'])
+        self.assertEqual(len(result), len(expected) + 1)
+        self.assertIn({'name': 'P0-new', 'age': '39'}, result)
+
+    def test_large_results_are_not_cached(self):
+        rows = self.fetcher.fetch_data()
+        results = ResultCache(self.tmp.name, max_result_bytes=200)
+        self.assertEqual(list(self.fetcher.cache_rows(results, 'large', iter(rows))), rows)
+        self.assertIsNone(results.get('large'))
+        self.assertEqual(list(self.fetcher.cache_rows(results, 'small', iter(rows[:3]))), rows[:3])
+        self.assertEqual(results.get('small'), (rows[:3], None))
+
+    def test_results_of_unreadable_files_are_not_cached(self):
+        self.fetcher.use_results = True
+        expected = self.fetcher.fetch_data(sort='age')
+        ResultCache(self.tmp.name).clear()
+        real_open = open
+        def failing_open(path, *args, **kwargs):
+            if str(path).endswith('test1.csv'):
+                raise PermissionError('Simulated permission error')
+            return real_open(path, *args, **kwargs)
+        with patch('builtins.open', failing_open), patch('builtins.print') as mock_print:
+            partial = self.fetcher.fetch_data(sort='age')
+        mock_print.assert_called_once_with("Error processing file test1.csv : Simulated permission error")
+        self.assertEqual(self.fetcher.failed_files, 1)
+        self.assertEqual(len(partial), len(expected) - 20)
+        # Read again once the file can be read, not answered with the partial result
+        self.assertEqual(self.fetcher.fetch_data(sort='age'), expected)
+        self.assertEqual(self.fetcher.failed_files, 0)
+
+    def test_fetch_many_matches_separate_fetches(self):
+        queries = [
+            {'filters': [('age', '>', '20')], 'sort': 'age', 'reverse': True, 'limit': 4},
+            {'filters': [('name', '<', 'P2')], 'columns': ['name']},
+            {}
+        ]
+        for jobs in (1, 2):
+            answers = self.fetcher.fetch_many(queries, jobs)
+            self.assertEqual(len(answers), len(queries))
+            for query, (rows, analytics) in zip(queries, answers):
+                self.assertEqual(rows, self.fetcher.fetch_data(**query))
+                self.assertEqual(analytics, Fetcher.get_analytics(rows))
+        with self.assertRaises(ValueError):
+            self.fetcher.fetch_many([{}, {'filters': [('age', '~', '1')]}])
+
+    def test_invalid_queries_are_rejected_before_scanning(self):
+        with patch.object(Fetcher, 'scan_file_many') as scan:
+            for query in ({'sort': 'age', 'columns': ['name']}, {'limit': 0}, {'filters': [('age', '~', '1')]}):
+                with self.subTest(query=query), self.assertRaises(ValueError):
+                    self.fetcher.fetch_many([{}, query])
+        scan.assert_not_called()
+        Fetcher.check_query({'sort': 'age', 'columns': ['name', 'age'], 'limit': 1})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,80 @@
+import os
+import unittest
+from src.indexes import SecondaryIndex, ZoneMaps
+from helpers import DataDirectory
+
+class TestSecondaryIndex(DataDirectory, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        companies = ['Acme', 'Globex', 'Initech']
+        # test2.csv has no Initech row
+        filenames = self.write_files(3, 'Product ID,Company,Origin,Category,Stock,Unit Price', lambda i, j: f'P{i}-{j},{companies[j % (3 - i // 2)]},Belgium,Tool,{j},{j / 2}', 30)
+        self.index = SecondaryIndex(self.tmp.name)
+        self.index.build(filenames)
+
+    def test_lookup(self):
+        self.assertEqual(len(self.index.lookup('test0.csv', [('Company', '==', 'Initech')])), 10)
+        self.assertEqual(self.index.lookup('test2.csv', [('Company', '==', 'Initech')]), [])
+        self.assertEqual(self.index.lookup('test0.csv', [('Company', '==', 'Acme'), ('Origin', '==', 'France')]), [])
+        # Only equality filters on indexed columns can use the index
+        self.assertIsNone(self.index.lookup('test0.csv', [('Company', '<', 'B')]))
+        self.assertIsNone(self.index.lookup('test0.csv', [('Stock', '==', '3')]))
+
+    def test_fetch_with_index(self):
+        filters = [('Company', '==', 'Initech'), ('Stock', '>', '10')]
+        expected = self.fetcher.fetch_data(filters)
+        self.fetcher.use_index = True
+        self.assertEqual(self.fetcher.fetch_data(filters), expected)
+        self.assertEqual(self.fetcher.fetch_data(filters, jobs=2), expected)
+
+    def test_outdated_entry_is_ignored(self):
+        self.append('test2.csv', 'P2-30,Initech,Belgium,Tool,30,15.0')
+        self.assertIsNone(SecondaryIndex(self.tmp.name).load().lookup('test2.csv', [('Company', '==', 'Initech')]))
+        self.fetcher.use_index = True
+        self.assertEqual(len(self.fetcher.fetch_data([('Company', '==', 'Initech')])), 21)
+
+    def test_entries_are_stored_and_read_per_file(self):
+        index_directory = os.path.join(self.tmp.name, SecondaryIndex.PATH)
+        self.assertEqual(sorted(os.listdir(index_directory)), sorted(f'test{i}.csv{extension}' for i in range(3) for extension in ('.json', '.offsets')))
+        index = SecondaryIndex(self.tmp.name).load()
+        # Nothing is read without an equality filter on an indexed column
+        self.assertIsNone(index.lookup('test0.csv', [('Stock', '>', '3')]))
+        self.assertEqual(index.files, {})
+        self.assertEqual(len(index.lookup('test1.csv', [('Company', '==', 'Globex')])), 10)
+        self.assertEqual(list(index.files), ['test1.csv'])
+        # Entries of removed files are removed with them
+        os.remove(os.path.join(self.tmp.name, 'test0.csv'))
+        index.build(['test1.csv', 'test2.csv'])
+        self.assertNotIn('test0.csv.json', os.listdir(index_directory))
+
+class TestZoneMaps(DataDirectory, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        # Stock of test{i}.csv goes from 100 * i to 100 * i + 49
+        filenames = self.write_files(3, 'Product ID,Company,Stock,Unit Price', lambda i, j: f'P{i}-{j},Acme,{100 * i + j},{j / 4}', 50)
+        self.zone_maps = ZoneMaps(self.tmp.name)
+        self.zone_maps.BLOCK_ROWS = 10
+        self.zone_maps.build(filenames)
+
+    def test_spans(self):
+        self.assertEqual(self.zone_maps.spans('test0.csv', [('Stock', '>', '100')]), [])
+        self.assertIsNone(self.zone_maps.spans('test1.csv', [('Stock', '>', '100')]))
+        self.assertEqual(len(self.zone_maps.spans('test1.csv', [('Stock', '>=', '125')])), 3)
+        self.assertIsNone(self.zone_maps.spans('test1.csv', [('Company', '==', 'Acme')]))
+
+    def test_fetch_prunes_files_and_blocks(self):
+        filters = [('Stock', '>=', '125'), ('Stock', '<', '200')]
+        expected = self.fetcher.fetch_data(filters)
+        self.fetcher.use_index = True
+        self.assertEqual(self.fetcher.fetch_data(filters), expected)
+        self.assertEqual(self.fetcher.pruned_files, 2)
+        self.assertEqual(self.fetcher.pruned_blocks, 2)
+
+    def test_zone_maps_are_refreshed(self):
+        self.append('test0.csv', 'P0-50,Acme,500,1.0')
+        self.fetcher.use_index = True
+        self.assertEqual(len(self.fetcher.fetch_data([('Stock', '>', '400')])), 1)
+        self.assertEqual(self.fetcher.pruned_files, 2)
+
+if __name__ == '__main__':
+    unittest.main()
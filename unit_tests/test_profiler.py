@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from src.profiler import Profiler
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler()
+
+    def slow(self, items, seconds):
+        for item in items:
+            time.sleep(seconds)
+            yield item
+
+    def test_nested_stages_are_subtracted(self):
+        stats = self.profiler.file('a.csv')
+        rows = self.profiler.timed('read', self.slow(range(5), 0.01), stats, 'rows_scanned')
+        rows = self.profiler.timed('filter', (row for row in rows if row % 2), stats, 'rows_matched', 'seconds')
+        with self.profiler.stage('sort'):
+            result = sorted(rows, reverse=True)
+        self.assertEqual(result, [3, 1])
+        stages = self.profiler.result()['stages']
+        self.assertEqual(stages['read']['items'], 5)
+        self.assertEqual(stages['filter']['items'], 2)
+        self.assertGreaterEqual(stages['read']['seconds'], 0.05)
+        # The sleeps belong to read, not to the stages consuming its rows
+        self.assertLess(stages['filter']['seconds'], 0.01)
+        self.assertLess(stages['sort']['seconds'], 0.01)
+        self.assertEqual((stats['rows_scanned'], stats['rows_matched']), (5, 2))
+        self.assertGreaterEqual(stats['seconds'], 0.05)
+        self.assertEqual(self.profiler.stack, [])
+
+    def test_exception_leaves_stage(self):
+        def failing():
+            yield 1
+            raise ValueError('bad row')
+        with self.assertRaises(ValueError):
+            list(self.profiler.timed('read', failing()))
+        self.assertEqual(self.profiler.stack, [])
+        self.assertEqual(self.profiler.stages['read'][1], 1)
+
+    def test_merge(self):
+        other = Profiler()
+        list(other.timed('read', range(3), other.file('a.csv'), 'rows_scanned'))
+        other.file('b.csv')['bytes'] = 10
+        list(self.profiler.timed('read', range(2), self.profiler.file('a.csv'), 'rows_scanned'))
+        self.profiler.merge(other)
+        result = self.profiler.result()
+        self.assertEqual(result['stages']['read']['items'], 5)
+        self.assertEqual(result['files']['a.csv']['rows_scanned'], 5)
+        self.assertEqual((result['rows_scanned'], result['bytes']), (5, 10))
+
+    def test_open_counts_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.csv')
+            with open(path, 'w') as f:
+                f.write('name,age\nAlice,25\n')
+            stats = self.profiler.file('a.csv')
+            with Profiler.open(path, stats) as f:
+                self.assertEqual(f.read(), 'name,age\nAlice,25\n')
+            self.assertEqual(stats['bytes'], os.path.getsize(path))
+
+    def test_result_and_summary(self):
+        stats = self.profiler.file('a.csv')
+        list(self.profiler.timed('filter', range(4), stats, 'rows_matched', 'seconds'))
+        stats['rows_scanned'] = 8
+        result = self.profiler.result()
+        self.assertEqual(json.loads(json.dumps(result)), result)
+        self.assertIn('process', result['peak_memory'])
+        summary = Profiler.summary(result)
+        self.assertIn('8 rows scanned, 4 matched', summary)
+        self.assertIn('a.csv', summary)
+        self.assertIn('(50.0 %)', summary)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+from src.results import ResultCache
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.csv')
+        with open(self.path, 'w') as f:
+            f.write('name,age\nAlice,25\n')
+        self.cache = ResultCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_normalizes_query(self):
+        query = {'filters': [('age', '>', '20'), ('name', '!=', 'Bob')], 'sort': None, 'reverse': True}
+        key = self.cache.key(query, ['test.csv'])
+        self.assertEqual(key, self.cache.key({'filters': [('name', '!=', 'Bob'), ('age', '>', 20)]}, ['test.csv']))
+        self.assertNotEqual(key, self.cache.key(dict(query, sort='age'), ['test.csv']))
+        self.assertNotEqual(key, self.cache.key(dict(query, limit=1), ['test.csv']))
+        self.assertNotEqual(self.cache.key({'columns': ['name', 'age']}, []), self.cache.key({'columns': ['age', 'name']}, []))
+
+    def test_key_changes_with_files(self):
+        key = self.cache.key({}, ['test.csv'])
+        with open(self.path, 'a') as f:
+            f.write('Bob,30\n')
+        self.assertNotEqual(self.cache.key({}, ['test.csv']), key)
+        self.assertNotEqual(self.cache.key({}, []), key)
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get('missing'))
+        rows = [{'name': 'Alice', 'age': '25'}]
+        self.assertTrue(self.cache.put('a', rows, {'numeric': {}, 'categorical': {}}))
+        self.assertEqual(self.cache.get('a'), (rows, {'numeric': {}, 'categorical': {}}))
+        self.assertTrue(self.cache.put('b', []))
+        self.assertEqual(self.cache.get('b'), ([], None))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_least_recently_used_are_evicted(self):
+        rows = [{'name': 'x' * 100}]
+        cache = ResultCache(self.tmp.name, max_bytes=300, max_result_bytes=300)
+        self.assertFalse(cache.put('large', [{'name': 'x' * 400}]))
+        for key in ('a', 'b'):
+            self.assertTrue(cache.put(key, rows))
+            time.sleep(0.01)
+        # a becomes the most recently used, b is evicted to make room for c
+        self.assertIsNotNone(cache.get('a'))
+        time.sleep(0.01)
+        self.assertTrue(cache.put('c', rows))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertIsNone(cache.get('large'))
+
+if __name__ == '__main__':
+    unittest.main()
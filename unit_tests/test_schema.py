@@ -0,0 +1,40 @@
+import unittest
+from src.analytics import Analytics
+from src.schema import COLUMNS_NAMES, Record, parse
+
+class TestRecord(unittest.TestCase):
+    def setUp(self):
+        self.row = {'Product ID': 'ALF-001', 'Company': 'Acme', 'Origin': 'Belgium', 'Category': 'Tool', 'Stock': '42', 'Unit Price': '12.5'}
+
+    def test_numbers_parsed_once(self):
+        record = Record.from_row(self.row)
+        self.assertEqual(record['Stock'], 42)
+        self.assertEqual(record.get('Unit Price'), 12.5)
+        self.assertIsNone(record.get('Unknown'))
+        self.assertEqual(list(record), COLUMNS_NAMES)
+        self.assertEqual(record.to_dict(), self.row)
+        self.assertEqual(record.to_dict(['Stock']), {'Stock': '42'})
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_values_written_differently_stay_strings(self):
+        self.assertEqual(parse('007', int), '007')
+        self.assertEqual(parse('1.50', float), '1.50')
+        self.assertEqual(parse('n/a', float), 'n/a')
+        self.assertEqual(parse('0.1', float), 0.1)
+        row = dict(self.row, **{'Stock': '007', 'Unit Price': '1e3'})
+        self.assertEqual(Record.from_row(row).to_dict(), row)
+
+    def test_other_columns_are_not_compacted(self):
+        self.assertIsNone(Record.from_row({'name': 'Alice', 'age': '30'}))
+        reordered = {key: self.row[key] for key in reversed(COLUMNS_NAMES)}
+        self.assertIsNone(Record.from_row(reordered))
+
+    def test_same_analytics_as_rows(self):
+        rows = [dict(self.row, **{'Stock': str(i), 'Unit Price': str(i / 4), 'Company': f'C{i % 3}'}) for i in range(40)]
+        expected, result = Analytics(), Analytics()
+        expected.update(rows)
+        result.update(Record.from_row(row) for row in rows)
+        self.assertEqual(result.result(), expected.result())
+
+if __name__ == '__main__':
+    unittest.main()
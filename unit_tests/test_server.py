@@ -0,0 +1,85 @@
+import asyncio
+import os
+import unittest
+from src.fetcher import Fetcher
+from src.server import QueryServer, QueryClient
+from helpers import DataDirectory, sample_value
+
+class TestQueryServer(DataDirectory, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_files(3, 'name,age', lambda i, j: f'P{i}-{j},{sample_value(i, j)}')
+        self.server = QueryServer(self.fetcher)
+        self.server.refresh()
+
+    def test_answer_matches_fetch_data(self):
+        queries = [
+            {},
+            {'filters': [['age', '>=', '10']], 'sort': 'age', 'reverse': True},
+            {'filters': [['name', '<', 'P1']], 'columns': ['name'], 'limit': 4},
+            {'sort': 'age', 'limit': 3}
+        ]
+        for query in queries:
+            expected = self.fetcher.fetch_data(**query)
+            answer = self.server.answer(query)
+            self.assertEqual(answer['rows'], expected)
+            self.assertEqual(answer['analytics'], Fetcher.get_analytics(expected))
+        with self.assertRaises(ValueError):
+            self.server.answer({'filters': [['age', '~', '1']]})
+
+    def test_invalid_queries_are_rejected(self):
+        for query in ({'limit': 0}, {'limit': -1}, {'sort': 'age', 'limit': -2}, {'sort': 'age', 'columns': ['name']}):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                self.server.answer(query)
+
+    def test_refresh_reads_changed_files_only(self):
+        self.assertFalse(self.server.refresh())
+        rows = self.server.files['test0.csv'][1]
+        self.write('test1.csv', 'name,age', ['New,1'])
+        self.assertTrue(self.server.refresh())
+        self.assertIs(self.server.files['test0.csv'][1], rows)
+        self.assertEqual(self.server.files['test1.csv'][1], [{'name': 'New', 'age': '1'}])
+        os.remove(os.path.join(self.tmp.name, 'test2.csv'))
+        self.assertTrue(self.server.refresh())
+        self.assertEqual(self.server.answer({})['rows'], self.fetcher.fetch_data())
+
+    def test_client_round_trip(self):
+        query = {'filters': [['age', '<', '20']], 'sort': 'name', 'limit': 5}
+
+        async def scenario():
+            server = await self.server.start('127.0.0.1', 0)
+            address = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            try:
+                client = QueryClient(address)
+                answers = await asyncio.gather(*(asyncio.to_thread(client.fetch, query) for _ in range(3)))
+                with self.assertRaises(ValueError):
+                    await asyncio.to_thread(client.fetch, {'filters': [['Stock', '>', 'many']]})
+                return answers
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        expected = self.fetcher.fetch_data(**query)
+        for rows, analytics in asyncio.run(scenario()):
+            self.assertEqual(rows, expected)
+            self.assertEqual(analytics, Fetcher.get_analytics(expected))
+
+    def test_records_match_fetch_data(self):
+        for i in range(3):
+            os.remove(os.path.join(self.tmp.name, f'test{i}.csv'))
+        self.write('products.csv', 'Product ID,Company,Origin,Category,Stock,Unit Price', (
+            f'P-{j},{["Acme", "Globex"][j % 2]},Belgium,Tool,{j * 7 % 30:0{1 + j % 2}},{j / 4}' for j in range(40)))
+        self.server.refresh()
+        self.assertTrue(all(row.__class__.__name__ == 'Record' for row in self.server.files['products.csv'][1]))
+        for query in ({'filters': [['Stock', '>', '10']], 'sort': 'Unit Price', 'reverse': True, 'limit': 5},
+                      {'filters': [['Company', '==', 'Acme']], 'columns': ['Stock', 'Company'], 'sort': 'Stock'}):
+            self.assertEqual(self.server.answer(query)['rows'], self.fetcher.fetch_data(**query))
+        with self.assertRaises(ValueError):
+            self.server.answer({'columns': ['Stock'], 'sort': 'Company'})
+
+    def test_client_invalid_address(self):
+        with self.assertRaises(ValueError):
+            QueryClient('localhost')
+
+if __name__ == '__main__':
+    unittest.main()
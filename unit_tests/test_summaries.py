@@ -0,0 +1,56 @@
+import os
+import unittest
+from unittest.mock import patch
+from src.fetcher import Fetcher
+from src.summaries import Summaries
+from helpers import DataDirectory, assert_same_analytics, sample_value
+
+class TestSummaries(DataDirectory, unittest.TestCase):
+    HEADER = 'Product ID,Company,Origin,Category,Stock,Unit Price'
+
+    def setUp(self):
+        super().setUp()
+        categories = ['Tool', 'Food', 'Toy']
+        self.filenames = self.write_files(3, self.HEADER, lambda i, j: f'P{i}-{j},Acme,Belgium,{categories[(i + j) % 3]},{sample_value(i, j)},{j / 4}', 30)
+        self.summaries = Summaries(self.tmp.name)
+        self.summaries.build(self.filenames)
+
+    def test_analytics_match_a_scan(self):
+        filenames = self.fetcher.list_files()
+        expected = Fetcher.get_analytics(self.fetcher.fetch_data())
+        # Product IDs are unique, their counts are not summarised
+        del expected[1]['Product ID']
+        assert_same_analytics(self, Summaries(self.tmp.name).load().analytics(filenames).result(), expected)
+
+    def test_groups_match_filtered_scans(self):
+        groups = self.summaries.groups(self.fetcher.list_files(), 'Category')
+        self.assertEqual(set(groups), {'Tool', 'Food', 'Toy'})
+        for value, group in groups.items():
+            rows = self.fetcher.fetch_data([('Category', '==', value)], columns=Summaries.GROUPED)
+            assert_same_analytics(self, group.result(), Fetcher.get_analytics(rows))
+
+    def test_only_changed_files_are_read(self):
+        self.assertEqual(self.summaries.stale(self.filenames), [])
+        self.write('test1.csv', self.HEADER, ['N-1,Acme,Belgium,Tool,3,1.5'])
+        self.assertEqual(self.summaries.stale(self.filenames), ['test1.csv'])
+        with patch.object(Summaries, 'describe', wraps=self.summaries.describe) as describe:
+            self.summaries.build(self.filenames)
+        describe.assert_called_once_with('test1.csv')
+        self.assertEqual(self.summaries.analytics(['test1.csv']).result()[0]['Stock']['total'], 3)
+
+    def test_unchanged_summaries_are_read_once_and_not_written(self):
+        self.write('test1.csv', self.HEADER, ['N-1,Acme,Belgium,Tool,3,1.5'])
+        summaries = Summaries(self.tmp.name)
+        unchanged = os.path.join(summaries.path, 'test0.csv.json')
+        mtime = os.stat(unchanged).st_mtime_ns
+        with patch('builtins.open', wraps=open) as mock_open:
+            self.assertEqual(summaries.stale(self.filenames), ['test1.csv'])
+            summaries.build(self.filenames)
+            summaries.analytics(self.filenames)
+        opened = [call.args for call in mock_open.call_args_list if call.args[0] == unchanged]
+        self.assertEqual(opened, [(unchanged, 'r')])
+        self.assertEqual(os.stat(unchanged).st_mtime_ns, mtime)
+        self.assertEqual(sorted(os.listdir(summaries.path)), [f'{filename}.json' for filename in self.filenames])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,5 +35,15 @@ class TestUtils(unittest.TestCase):
         result = Utils.validate_input("Do you want to proceed?")
         self.assertFalse(result)
 
+    @patch("builtins.input")
+    def test_validate_input_assume_yes(self, mock_input):
+        Utils.assume_yes = True
+        try:
+            result = Utils.validate_input("Do you want to proceed?")
+        finally:
+            Utils.assume_yes = False
+        self.assertTrue(result)
+        mock_input.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,35 @@
+import unittest
+from src.columnar import ColumnarCache
+from src.fetcher import Fetcher
+from helpers import DataDirectory, assert_same_analytics, sample_value
+
+@unittest.skipUnless(ColumnarCache.available(), "NumPy is not installed")
+class TestNumpyEngine(DataDirectory, unittest.TestCase):
+    def setUp(self):
+        from src.vectorized import NumpyEngine
+        super().setUp()
+        self.write_files(3, 'Product ID,Company,Stock,Unit Price', lambda i, j: f'P{i}-{j},{"ABCD"[(i + j) % 4]}co,{sample_value(i, j)},{(i * 31 + j * 17) % 997 / 10}', 40)
+        self.engine = NumpyEngine(self.fetcher)
+
+    def assertSameResults(self, **query):
+        expected = self.fetcher.fetch_data(**query)
+        table = self.engine.query(**query)
+        self.assertEqual(list(self.engine.rows(table)), expected)
+        assert_same_analytics(self, self.engine.get_analytics(table), Fetcher.get_analytics(expected))
+
+    def test_same_results_as_python(self):
+        self.assertSameResults()
+        self.assertSameResults(filters=[('Stock', '>=', '20'), ('Company', '!=', 'Bco')])
+        self.assertSameResults(filters=[('Unit Price', '<', '50')], columns=['Company', 'Unit Price'])
+
+    def test_same_sort_order_as_python(self):
+        self.assertSameResults(sort='Stock')
+        self.assertSameResults(sort='Company', reverse=True)
+        self.assertSameResults(sort='Unit Price', reverse=True, limit=7)
+
+    def test_invalid_filter(self):
+        with self.assertRaises(ValueError):
+            self.engine.query([('Stock', '=', '3')])
+
+if __name__ == '__main__':
+    unittest.main()